@@ -15,6 +15,7 @@ def delete_selected(tree, load_data_func, search_term, stat_vars):
     prod_name = vals[1]
     prod_code = vals[2]
     if messagebox.askyesno("Delete", f"Are you sure you want to delete:\n{prod_name} ({prod_code}) ?"):
-        delete_product(prod_id)
-        load_data_func(tree, search_term, stat_vars)
+        # the ProductStore tells the main tree (and the stats) that the row is gone
+        if not delete_product(prod_id):
+            return
         messagebox.showinfo("Deleted", "✅ Product deleted successfully.")
@@ -4,32 +4,45 @@ from tkinter import filedialog, messagebox
 import ttkbootstrap as tb 
 
 import csv
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import re
 import sqlite3
-
-DB_FILE = "inventory.db"
+import time
+import warnings
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from contextlib import nullcontext
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # optional: without pandas the CSV is parsed row by row
+    pd = None
+
+from app.utils.dp_utils import init_db
+from app.utils.product_repository import JOURNAL_COUNTERS, get_repository
+from app.utils.snapshot import open_plan
+from app.utils.task_executor import TaskCancelled, get_executor
+
+CHUNK_BYTES = 1 << 20  # CSV bytes per chunk (whole records): one commit + checkpoint, one progress report / cancel check
+FINGERPRINT_BYTES = 64 * 1024   # head and tail of the file hashed by _fingerprint()
+PARSE_WORKERS = os.cpu_count() or 1   # processes parsing files in parallel (batch import)
+_current_sync = None   # Task of the sync running in the background (one at a time)
+
+# Per-row events (deleted / skipped at DEBUG, errors at WARNING) carry extra={"code", "status", ...}
+# for structured handlers; nothing per row reaches the console unless logging is configured.
+log = logging.getLogger(__name__)
+
+_WHITESPACE_LINE = re.compile(rb"^[ \t\f\v]+\r?$", re.M)
 
 # ------------------ Database Functions ------------------ #
 def create_table():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            code TEXT UNIQUE,
-            description TEXT,
-            cost REAL,
-            retail REAL,
-            required_qty INTEGER,
-            good_qty INTEGER,
-            gift INTEGER,
-            damaged_qty INTEGER,
-            total_qty INTEGER,
-            note TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+    # schema lives in one place (app.utils.migrations); this just makes sure it's current
+    init_db()
 
 
 def safe_int(value):
@@ -46,101 +59,476 @@ def safe_float(value):
         return 0.0
 
 
-# ------------------ Sync CSV with Database ------------------ #
-def sync_csv_to_db(csv_file, mode="update"):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-
-    inserted = 0
-    updated = 0
-    deleted = 0
-    skipped = 0
-    errors = 0
-    result_rows = []
+# ------------------ CSV Parsing ------------------ #
+# The file is read in binary blocks of about CHUNK_BYTES that always end at a record end, so every
+# chunk has an exact byte offset to resume from. Each block is parsed by one of two engines into
+# (batch, batch_errors, seen, last_line): batch = [(line, code, name, description, cost, retail,
+# required_qty)], batch_errors = result rows of lines that couldn't be parsed, seen = the block's
+# codes (rows without a code are ignored). Lines are data rows, numbered from 1 as csv.DictReader does.
+def _read_header(fb):
+    """Column names from the first line (None for an empty file); fb is left at the first record."""
+    first = fb.readline()
+    if not first:
+        return None
+    return next(csv.reader([first.decode('utf-8-sig')]), [])
 
-    # --- Load new CSV data ---
-    with open(csv_file, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        csv_rows = list(reader)
-        new_codes = {row.get('code', '').strip() for row in csv_rows if row.get('code')}
 
-    # --- Load existing DB codes ---
-    c.execute("SELECT code FROM products")
-    db_codes = {row[0] for row in c.fetchall()}
+def _record_blocks(fb, size=CHUNK_BYTES):
+    """
+    Yield (data, end_offset) blocks of whole records from fb's position, about `size` bytes each.
+    A block that contains a double quote may end inside a quoted field spanning lines; the csv
+    module then finds its last record end (see _last_record_end) and the block is cut back there.
+    Counting quotes isn't enough: a stray " in an unquoted field (12" pipe) flips the parity.
+    """
+    while True:
+        start = fb.tell()
+        data = fb.read(size)
+        if not data:
+            return
+        data += fb.readline()
+        while b'"' in data:
+            end = _last_record_end(data)
+            if end is not None:
+                if end < len(data):
+                    data = data[:end]
+                    fb.seek(start + end)
+                break
+            more = fb.read(len(data))  # a single record longer than the block: read on
+            if not more:
+                break
+            data += more + fb.readline()
+        yield data, fb.tell()
+
+
+def _last_record_end(data):
+    """
+    Offset in data just after its last complete record, by csv.reader's rules (None: none).
+    Data csv.reader refuses counts as whole; parsing the block reports the error.
+    """
+    pos = 0
+    end = None
+    exhausted = False
 
-    # --- Deletion only happens in UPDATE mode ---
-    if mode == "update":
-        codes_to_delete = db_codes - new_codes
-
-        for code in codes_to_delete:
-            try:
-                # Check total_qty before deletion
-                c.execute("SELECT total_qty FROM products WHERE code = ?", (code,))
-                result = c.fetchone()
-                if result and result[0] > 0:
-                    skipped += 1
-                    result_rows.append(('N/A', code, f'skipped (qty={result[0]})'))
-                    print(f"⏭️ Skipped deletion of {code} (total_qty = {result[0]})")
-                    continue
-                
-                c.execute("DELETE FROM products WHERE code = ?", (code,))
-                deleted += 1
-                result_rows.append(('N/A', code, 'deleted'))
-                print(f"🗑️ Deleted old product: {code}")
-            except Exception as e:
-                errors += 1
-                result_rows.append(('N/A', code, f'error: {e}'))
-                print(f"⚠️ Error deleting {code}: {e}")
-
-    # --- Process each row in CSV (insert or update) ---
-    for index, row in enumerate(csv_rows, start=1):
+    def lines():
+        nonlocal pos, exhausted
+        for raw in data.splitlines(keepends=True):
+            pos += len(raw)
+            yield raw.decode('utf-8', 'replace')
+        exhausted = True
+
+    try:
+        for _ in csv.reader(lines()):
+            if not exhausted:  # a row only handed out at the end is a quoted field left open
+                end = pos
+    except csv.Error:  # NUL byte, ...
+        return len(data)
+    return end
+
+
+def _chunks(fb, header, engine="csv", line=0):
+    """(batch, batch_errors, seen, last_line, end_offset) per block, from fb's position (after `line` rows)."""
+    for data, end in _record_blocks(fb):
+        parsed = None
+        # blank-looking lines count as rows for csv.DictReader but are skipped by pandas
+        if engine == "pandas" and not _WHITESPACE_LINE.search(data):
+            parsed = _pandas_block(data, header, line)
+        if parsed is None:
+            parsed = _csv_block(data, header, line)
+        batch, batch_errors, seen, line = parsed
+        yield batch, batch_errors, seen, line, end
+
+
+def _parse_rows(rows, batch, batch_errors, seen):
+    """Row-by-row parsing of (line, row dict) pairs."""
+    for index, row in rows:
         try:
             code = (row.get('code') or '').strip()
             if not code:
                 continue
+            seen.append(code)
 
             name = (row.get('name') or '').strip()
             description = (row.get('description') or '').strip()
             cost = safe_float(row.get('cost', 0))
             retail = safe_float(row.get('retail', 0))
             required_qty = safe_int(row.get('required_qty', 0))
+            if not -2 ** 63 <= required_qty < 2 ** 63:  # SQLite INTEGER is 64-bit
+                raise ValueError(f"required_qty out of range ({row.get('required_qty')})")
+            batch.append((index, code, name, description, cost, retail, required_qty))
 
-            c.execute("SELECT 1 FROM products WHERE code = ?", (code,))
-            exists = c.fetchone() is not None
-
-            if exists:
-                # Update only basic data, without touching quantities
-                c.execute("""
-                    UPDATE products
-                    SET name=?, description=?, cost=?, retail=?, required_qty=?
-                    WHERE code=?
-                """,(name, description, cost, retail, required_qty, code))
-                updated += 1
-                result_rows.append((index, code, 'updated'))
+        except Exception as e:
+            batch_errors.append((index, code, f'error: {e}'))
+            log.warning("Error processing %s: %s", code, e, extra={"line": index, "code": code, "status": "error"})
+
+
+def _csv_block(data, header, line):
+    rows = list(csv.DictReader(io.StringIO(data.decode('utf-8'), newline=''), fieldnames=header))
+    batch, batch_errors, seen = [], [], []
+    _parse_rows(enumerate(rows, start=line + 1), batch, batch_errors, seen)
+    return batch, batch_errors, seen, line + len(rows)
+
+
+def _floats(values):
+    """safe_float() over an object array of CSV strings, in one NumPy pass when they all parse."""
+    values = np.where(values == "", "0", values)
+    try:
+        return values.astype(np.float64)  # float() per cell in C: same parsing and rounding
+    except (ValueError, TypeError):
+        return np.array([safe_float(v) for v in values], dtype=np.float64)
+
+
+def _pandas_block(data, header, line):
+    """
+    Columnar engine: the block is read by pandas as text columns and coerced in vectorized
+    passes with the same rules as safe_float()/safe_int() (junk → 0, decimals truncated), so
+    batches match the row-by-row engine's exactly. The rare quantities that don't fit an
+    INTEGER (inf, beyond 64 bits) go through _parse_rows to get the same per-row error.
+    Returns None when pandas can't read the block (e.g. a line with more fields than the
+    header, which csv.DictReader accepts): _chunks() then uses the row-by-row engine.
+
+    A code repeated within the block is reported (INFO); every line still goes to the DB layer,
+    which writes the last one and gives each line its status, as with the row-by-row engine.
+    """
+    try:
+        with warnings.catch_warnings():
+            # extra fields on the block's first line: pandas drops them as DictReader does, but says
+            # so on stderr; the row-by-row engine takes that row silently, so this one does too
+            warnings.simplefilter("ignore", pd.errors.ParserWarning)
+            df = pd.read_csv(io.BytesIO(data), header=None, names=header, index_col=False,
+                             dtype=str, keep_default_na=False, encoding='utf-8')
+    except ValueError:  # pandas.errors.ParserError, duplicate column names, ...
+        return None
+    n = len(df)
+    if not n:
+        return [], [], [], line
+    lines = np.arange(line + 1, line + n + 1)
+
+    def column(col, strip=False):
+        if col not in df:
+            return np.full(n, "", dtype=object)
+        values = df[col].to_numpy(dtype=object)
+        # plain str.strip per cell: cheaper than .str.strip() on object columns
+        return np.array([v.strip() for v in values], dtype=object) if strip else values
+
+    code = column("code", strip=True)
+    fields = {col: column(col, strip=col in ("name", "description"))
+              for col in ("name", "description", "cost", "retail", "required_qty")}
+    cost = _floats(fields["cost"])
+    retail = _floats(fields["retail"])
+    qty = _floats(fields["required_qty"])
+
+    has_code = code != ""
+    too_big = np.isinf(qty) | (np.abs(qty) >= 2 ** 63)
+    odd = has_code & too_big
+    ok = has_code & ~odd
+    required_qty = np.where(np.isnan(qty) | too_big, 0, np.trunc(qty)).astype(np.int64)
+
+    # .tolist() → Python str/float/int: what sqlite3 and catalog_hash() expect
+    batch = list(zip(
+        lines[ok].tolist(), code[ok].tolist(),
+        fields["name"][ok].tolist(), fields["description"][ok].tolist(),
+        cost[ok].tolist(), retail[ok].tolist(), required_qty[ok].tolist(),
+    ))
+    seen = code[ok].tolist()
+    batch_errors = []
+    if odd.any():
+        rows = ((int(lines[i]), {"code": code[i], **{k: v[i] for k, v in fields.items()}})
+                for i in np.flatnonzero(odd))
+        _parse_rows(rows, batch, batch_errors, seen)
+        batch.sort()
+
+    codes = pd.Series(code[has_code], index=lines[has_code])
+    for dup_line, dup in codes[codes.duplicated(keep="last")].items():
+        log.info("Duplicate code %s on line %s: a later line wins", dup, dup_line,
+                 extra={"line": int(dup_line), "code": dup, "status": "duplicate"})
+
+    return batch, batch_errors, seen, line + n
+
+
+def _fingerprint(path):
+    """Size, mtime and a hash of the head and tail: tells whether a checkpoint still fits the file."""
+    st = os.stat(path)
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as fb:
+        h.update(fb.read(FINGERPRINT_BYTES))
+        if st.st_size > FINGERPRINT_BYTES:
+            fb.seek(-FINGERPRINT_BYTES, os.SEEK_END)
+            h.update(fb.read())
+    return f"{st.st_size}:{st.st_mtime_ns}:{h.hexdigest()}"
+
+
+def resumable_import(csv_file=None, mode=None):
+    """
+    The unfinished import that can be resumed (of csv_file/mode when given) → its journal entry
+    (dict: path, mode, byte_offset, line, counters, ...), or None. An entry whose file is gone
+    or changed since can't be resumed: None as well.
+    """
+    journal = get_repository().pending_import()
+    if journal is None:
+        return None
+    if csv_file is not None and os.path.abspath(journal["path"]) != os.path.abspath(csv_file):
+        return None
+    if mode is not None and journal["mode"] != mode:
+        return None
+    try:
+        if _fingerprint(journal["path"]) != journal["fingerprint"]:
+            return None
+    except OSError:
+        return None
+    return journal
+
+
+def _journal_text(journal):
+    """One line about an interrupted import, e.g. for the resume prompt."""
+    try:
+        done = f" ({journal['byte_offset'] / os.path.getsize(journal['path']):.0%})"
+    except (OSError, ZeroDivisionError):
+        done = ""
+    return (f"The {journal['mode'].upper()} sync of {os.path.basename(journal['path'])} "
+            f"stopped after row {journal['line']:,}{done} on {journal['updated_at']}.")
+
+
+# ------------------ Sync CSV with Database ------------------ #
+def sync_csv_to_db(csv_file, mode="update", task=None, dry_run=False, engine="auto", resume=False, counts=None):
+    """
+    Stream the CSV in chunks of about CHUNK_BYTES (whole records): memory stays flat whatever the
+    file size. Each chunk is committed on its own, with a checkpoint in the import journal (file
+    fingerprint, byte offset, rows done, counters): if the app is closed or crashes mid-file,
+    resume=True continues the same file after its last checkpoint instead of starting over
+    (see resumable_import()). In UPDATE mode the codes applied are kept in import_seen_codes,
+    and the deletion phase runs once the whole file is in.
+
+    task: optional Task from the TaskExecutor → after each chunk, progress is reported as
+    task.report(bytes_read, file_size, "<n> rows"); a cancel request stops at the last checkpoint.
+
+    Rows whose catalogue fields match what the last sync wrote (products.catalog_hash) aren't
+    rewritten; they're reported as "unchanged" and counted in neither inserted nor updated.
+    dry_run=True → "plan": the same result (inserted/updated/unchanged/deleted/skipped per row)
+    is worked out on a read snapshot (see snapshot.open_plan) without writing to the products
+    table or taking the writer lock (no journal).
+
+    engine: "pandas" (columnar parsing, see _pandas_block), "csv" (row by row) or "auto" →
+    pandas when it's installed. Both produce the same batches, so the same result.
+
+    Returns (inserted, updated, deleted, skipped, errors, result_rows). After a resume the counts
+    cover the whole file (journal + this run), result_rows only this run.
+    counts: optional empty Counter, filled with the inserted/updated/unchanged/errors counts
+    (e.g. for the "unchanged" total, which isn't in the returned tuple).
+    """
+    if engine == "auto":
+        engine = "pandas" if pd is not None else "csv"
+    counts = Counter() if counts is None else counts   # inserted / updated / unchanged / errors
+    result_rows = []
+    file_size = os.path.getsize(csv_file)
+    journal = None
+    line = 0
+
+    with open(csv_file, 'rb') as fb, (open_plan() if dry_run else nullcontext(get_repository())) as repo:
+        header = _read_header(fb)
+        if dry_run:
+            repo.begin_plan()
+            repo.begin_code_tracking()
+        else:
+            journal = resumable_import(csv_file, mode) if resume else None
+            if journal is not None:
+                fb.seek(journal["byte_offset"])
+                line = journal["line"]
+                counts.update({k: journal[k] for k in JOURNAL_COUNTERS})
+                result_rows.append(('N/A', '', f'resumed after row {line:,} ({journal["inserted"]} inserted, '
+                                                f'{journal["updated"]} updated, {journal["unchanged"]} unchanged, '
+                                                f'{journal["errors"]} errors before)'))
             else:
-                # Insert new product with default quantities = 0 (not from CSV)
-                c.execute("""
-                    INSERT INTO products (
-                        code, name, description, cost, retail,
-                        required_qty, good_qty, gift, damaged_qty, total_qty
-                    )
-                    VALUES (?, ?, ?, ?, ?, ?, 0, 0, 0, 0)
-                """, (code, name, description, cost, retail, required_qty))
-                inserted += 1
-                result_rows.append((index, code, 'inserted'))
+                journal = repo.start_import(os.path.abspath(csv_file), _fingerprint(csv_file), mode)
+
+        for batch, batch_errors, seen, line, offset in (_chunks(fb, header, engine, line) if header else ()):
+            if task:
+                task.check_cancelled()
+            with repo.db.transaction():  # the chunk and its checkpoint commit together (a dry run: a savepoint)
+                if dry_run:
+                    _apply_chunk(repo, batch, batch_errors, seen, counts, result_rows, dry_run=True)
+                else:
+                    _apply_chunk(repo, batch, batch_errors, seen if mode == "update" else (), counts,
+                                 result_rows, durable=True)
+                    repo.checkpoint_import(journal["id"], offset, line, counts)
+            if task:
+                task.report(offset, file_size, f"{line:,} rows")
+
+        # --- Deletion only happens in UPDATE mode: products whose code wasn't in the file ---
+        deleted = skipped = 0
+        with repo.db.transaction():
+            if mode == "update":
+                if journal is not None:
+                    repo.restore_tracked_codes()
+                deleted, skipped = _delete_untracked(repo, result_rows, dry_run)
+            if dry_run or mode == "update":
+                repo.end_code_tracking()
+            if journal is not None:
+                repo.finish_import(journal["id"])
+
+    return _summary(counts, deleted, skipped, result_rows, dry_run)
+
+
+def sync_csv_files_to_db(csv_files, mode="copy", task=None, dry_run=False, engine="auto", counts=None):
+    """
+    Batch import of many CSVs (e.g. one per supplier) as one sync. The files are parsed in
+    parallel by a pool of PARSE_WORKERS processes (one file per worker) while this thread, the
+    single writer, applies them one file per transaction: a cancel or a failing file keeps the
+    files committed before it (not journaled; UPDATE mode then deletes nothing). A dry run plans
+    every file on one read snapshot (see snapshot.open_plan) and writes nothing.
+
+    Conflict rule: files are applied oldest first (modification time, then name), so a code found
+    in several files ends up with the most recent file's data, just as a later line wins within a
+    file. Each such code also gets a "conflict: ..." row listing where it appeared.
+    UPDATE mode deletes (stock permitting) the products that are in none of the files, once all
+    of them are in.
+
+    Returns the same tuple as sync_csv_to_db (counts: see there); per-row results are
+    ("<file>:<line>", code, status).
+    """
+    if engine == "auto":
+        engine = "pandas" if pd is not None else "csv"
+    csv_files = sorted(csv_files, key=lambda p: (os.path.getmtime(p), os.path.basename(p)))
+    names = [os.path.basename(p) for p in csv_files]
+    sizes = [os.path.getsize(p) for p in csv_files]
+    counts = Counter() if counts is None else counts
+    result_rows = []
+    last_seen = {}   # code → (file index, line) of its latest row so far
+    conflicts = {}   # code → [(file index, last line in that file)] for codes in several files
 
-        except Exception as e:
-            errors += 1
-            result_rows.append((index, code, f'error: {e}'))
-            print(f"⚠️ Error processing {code}: {e}")
+    # spawn, not fork: this process runs Tk and DB threads
+    pool = ProcessPoolExecutor(max_workers=max(1, min(PARSE_WORKERS, len(csv_files))),
+                               mp_context=multiprocessing.get_context("spawn"))
+    try:
+        futures = [pool.submit(_parse_file, path, engine) for path in csv_files]
+        with (open_plan() if dry_run else nullcontext(get_repository())) as repo:
+            if dry_run:
+                repo.begin_plan()
+            repo.begin_code_tracking()
+            rows = 0
+            for k, future in enumerate(futures):
+                try:
+                    chunks = _wait_for(future, task)
+                    with repo.db.transaction():  # one commit per file (a dry run: a savepoint)
+                        for batch, batch_errors, seen, line, offset in chunks:
+                            if task:
+                                task.check_cancelled()
+                            _apply_chunk(repo, batch, batch_errors, seen, counts, result_rows, dry_run,
+                                         where=names[k])
+                            if task:
+                                task.report(sum(sizes[:k]) + offset, sum(sizes),
+                                            f"file {k + 1}/{len(csv_files)} · {rows + line:,} rows")
+                except TaskCancelled:
+                    raise
+                except Exception as e:
+                    raise RuntimeError(f"{names[k]}: {e}\n({k} of {len(csv_files)} files were imported "
+                                       f"before it)") from e
+                for batch, *_ in chunks:
+                    for row_line, code, *_ in batch:
+                        loc = last_seen.get(code)
+                        last_seen[code] = (k, row_line)
+                        if loc is None or (loc[0] == k and code not in conflicts):
+                            continue
+                        places = conflicts.setdefault(code, [loc])
+                        if places[-1][0] == k:
+                            places[-1] = (k, row_line)
+                        else:
+                            places.append((k, row_line))
+                rows += chunks[-1][3] if chunks else 0
+
+            for code, places in conflicts.items():
+                where = ", ".join(f"{names[k]}:{line}" for k, line in places)
+                result_rows.append(('N/A', code, f'conflict: {where} → {names[places[-1][0]]} wins'))
+                log.info("Code %s is in several files (%s); the latest file wins", code, where,
+                         extra={"code": code, "status": "conflict"})
+
+            deleted = skipped = 0
+            with repo.db.transaction():
+                if mode == "update":
+                    deleted, skipped = _delete_untracked(repo, result_rows, dry_run)
+                repo.end_code_tracking()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return _summary(counts, deleted, skipped, result_rows, dry_run, conflicts=len(conflicts))
+
+
+def _parse_file(path, engine):
+    """Process-pool worker: the whole file's chunks, as _chunks() yields them."""
+    with open(path, 'rb') as fb:
+        header = _read_header(fb)
+        return list(_chunks(fb, header, engine)) if header else []
+
+
+def _wait_for(future, task, poll=0.2):
+    """future.result(), still answering a cancel request while a worker parses."""
+    while True:
+        if task:
+            task.check_cancelled()
+        try:
+            return future.result(timeout=poll)
+        except FuturesTimeout:
+            pass
 
-    conn.commit()
-    conn.close()
 
-    print(f"\n✅ Summary: {inserted} inserted | {updated} updated | 🗑️ {deleted} deleted | ⏭️ {skipped} skipped | ⚠️ {errors} errors")
+def _apply_chunk(repo, batch, batch_errors, seen, counts, result_rows, dry_run=False, where=None, durable=False):
+    """
+    Insert/update one parsed chunk set-based, in one savepoint, and track its codes
+    (durable=True: in import_seen_codes, for a journaled sync).
+    Per-row results are appended to result_rows in CSV order (line prefixed with `where`,
+    the file name, in batch imports) and tallied in counts.
+    """
+    with repo.db.transaction():
+        repo.track_codes(seen, durable=durable)
+        results = sorted(_upsert_batch(repo, batch, apply=not dry_run) + batch_errors, key=lambda r: r[0])
+    for status in results:
+        counts[status[2] if status[2] in ("inserted", "updated", "unchanged") else "errors"] += 1
+        result_rows.append(status if where is None else (f"{where}:{status[0]}",) + status[1:])
+
+
+def _delete_untracked(repo, result_rows, dry_run=False):
+    """UPDATE mode: delete the products whose code wasn't tracked, only if total_qty = 0."""
+    # set-based: one DELETE, one SELECT for the skipped
+    deleted_codes, skipped_codes = repo.delete_untracked_if_empty(apply=not dry_run)
+    for code in deleted_codes:
+        result_rows.append(('N/A', code, 'deleted'))
+        log.debug("Deleted old product: %s", code, extra={"code": code, "status": "deleted"})
+    for code, qty in skipped_codes:
+        result_rows.append(('N/A', code, f'skipped (qty={qty})'))
+        log.debug("Skipped deletion of %s (total_qty = %s)", code, qty,
+                  extra={"code": code, "status": "skipped", "qty": qty})
+    return len(deleted_codes), len(skipped_codes)
+
+
+def _summary(counts, deleted, skipped, result_rows, dry_run=False, conflicts=0):
+    inserted, updated, unchanged, errors = (counts[k] for k in ("inserted", "updated", "unchanged", "errors"))
+    print(f"\n{'📝 Plan' if dry_run else '✅ Summary'}: {inserted} inserted | {updated} updated | "
+          f"= {unchanged} unchanged | 🗑️ {deleted} deleted | ⏭️ {skipped} skipped | ⚠️ {errors} errors"
+          + (f" | ⚔️ {conflicts} conflicts" if conflicts else ""))
     return inserted, updated, deleted, skipped, errors, result_rows
 
 
+def _upsert_batch(repo, batch, apply=True):
+    """
+    Update only basic data (never quantities), or insert with quantities = 0; unchanged rows are skipped.
+    One set-based statement per batch; if it fails (e.g. a constraint), the batch is
+    redone row by row so only the offending rows are reported as errors.
+    """
+    if not batch:
+        return []
+    try:
+        return repo.upsert_catalog_many(batch, apply=apply)
+    except sqlite3.Error:
+        pass
+    results = []
+    for index, code, *fields in batch:
+        try:
+            results.append((index, code, repo.upsert_catalog(code, *fields, apply=apply)))
+        except Exception as e:
+            results.append((index, code, f'error: {e}'))
+            log.warning("Error processing %s: %s", code, e, extra={"line": index, "code": code, "status": "error"})
+    return results
+
+
 # ------------------ User Interface ------------------ #
 def refresh_tree(tree, rows):
     for item in tree.get_children():
@@ -149,15 +537,38 @@ def refresh_tree(tree, rows):
         tree.insert("", "end", values=r)
 
 
-def select_file_sync(mode="update", tree=None, lbl_file=None, lbl_stats=None):
+def select_file_sync(mode="update", tree=None, lbl_file=None, lbl_stats=None, progress_bar=None, dry_run=False,
+                     batch=None):
     """
     mode: "copy" → insert/update only (no deletion)
           "update" → insert/update/delete (full sync)
+    progress_bar: optional determinate tb.Progressbar, filled by bytes read
+    dry_run: preview ("plan") what the sync would do; nothing is written, no confirmation asked
+    batch: "files" (pick several CSVs) or "folder" (every CSV in a folder) → one batch import,
+           see sync_csv_files_to_db; None → a single file
     """
-    file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
-    if not file_path:
+    global _current_sync
+    if sync_running():
+        messagebox.showwarning("Busy", "⏳ A sync is already running.")
         return
 
+    if batch == "files":
+        file_paths = list(filedialog.askopenfilenames(filetypes=[("CSV files", "*.csv")]))
+    elif batch == "folder":
+        folder = filedialog.askdirectory()
+        file_paths = sorted(
+            os.path.join(folder, name) for name in os.listdir(folder) if name.lower().endswith(".csv")
+        ) if folder else []
+        if folder and not file_paths:
+            messagebox.showinfo("No CSV files", f"ℹ️ No CSV files in:\n{folder}")
+    else:
+        file_paths = [filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])]
+    file_paths = [p for p in file_paths if p]
+    if not file_paths:
+        return
+    file_label = file_paths[0] if batch is None else f"{len(file_paths)} files: " + ", ".join(
+        os.path.basename(p) for p in file_paths)
+
     # --- Different warning messages based on mode ---
     if mode == "copy":
         warning_msg = (
@@ -192,25 +603,135 @@ def select_file_sync(mode="update", tree=None, lbl_file=None, lbl_stats=None):
             "⚠️ Make sure you have a backup before proceeding."
         )
 
+    if batch is not None:
+        warning_msg += (
+            f"\n\n📚 BATCH IMPORT: {len(file_paths)} files\n"
+            "A code found in several files gets the data of the most recent file."
+        )
+
+    # --- Same file as an interrupted sync → offer to resume from its last checkpoint ---
+    resume = False
+    journal = resumable_import(file_paths[0], mode) if batch is None and not dry_run else None
+    if journal:
+        answer = messagebox.askyesnocancel(
+            "Resume sync?",
+            f"⏯ {_journal_text(journal)}\n\n"
+            "Yes → continue from the last checkpoint\n"
+            "No → start over from the first row"
+        )
+        if answer is None:
+            return
+        resume = answer
+
     # --- Ask for confirmation ---
-    confirm = messagebox.askokcancel(
-        f"⚠️ Confirm Operation - {mode.upper()}",
-        warning_msg,
-        icon="warning"
-    )
-    if not confirm:
-        messagebox.showinfo("Operation Cancelled", "❌ Operation was cancelled.")
-        return
+    if not dry_run and not resume:
+        confirm = messagebox.askokcancel(
+            f"⚠️ Confirm Operation - {mode.upper()}",
+            warning_msg,
+            icon="warning"
+        )
+        if not confirm:
+            messagebox.showinfo("Operation Cancelled", "❌ Operation was cancelled.")
+            return
+
+    return _start_sync(file_paths, file_label, mode, tree, lbl_file, lbl_stats, progress_bar, dry_run, batch,
+                       resume)
+
 
+def _start_sync(file_paths, file_label, mode, tree, lbl_file, lbl_stats, progress_bar=None, dry_run=False,
+                batch=None, resume=False):
+    """Run the (confirmed) sync on the executor and wire its progress/result to the widgets."""
+    global _current_sync
+    verb = "Resuming" if resume else "Planning" if dry_run else "Syncing"
     if lbl_file:
-        lbl_file.config(text=file_path)
-    
-    inserted, updated, deleted, skipped, errors, result_rows = sync_csv_to_db(file_path, mode)
+        lbl_file.config(text=file_label)
+    if lbl_stats:
+        lbl_stats.config(text=f"⏳ {verb}...")
+
+    started = time.monotonic()
+    if progress_bar:
+        progress_bar.config(value=0)
+
+    def on_progress(done, total, message):
+        # done/total are bytes of the file(s); the ETA assumes the rest reads at the same pace
+        fraction = done / total if total else 0
+        elapsed = time.monotonic() - started
+        eta = f"{elapsed * (1 - fraction) / fraction:.0f}s" if fraction > 0 else "?"
+        if lbl_stats:
+            lbl_stats.config(
+                text=f"⏳ {verb}... {fraction:.0%} · {message} · "
+                     f"{done / 1e6:,.1f} / {total / 1e6:,.1f} MB · ETA {eta}"
+            )
+        if progress_bar:
+            progress_bar.config(value=fraction * 100)
+
+    # a single file commits chunk by chunk (see sync_csv_to_db), a batch file by file; a dry run writes nothing
+    if dry_run:
+        kept = None
+    elif batch is None:
+        kept = "Rows up to the last checkpoint are saved; pick the same file to resume."
+    else:
+        kept = "Files imported before it are saved."
+
+    def on_cancelled():
+        if lbl_stats:
+            lbl_stats.config(text=f"⏹ Sync stopped. {kept}" if kept else "⏹ Sync cancelled, nothing was changed.")
+        if progress_bar:
+            progress_bar.config(value=0)
+
+    def on_error(e):
+        if lbl_stats:
+            lbl_stats.config(text="")
+        if progress_bar:
+            progress_bar.config(value=0)
+        if kept:
+            messagebox.showerror("Error", f"❌ Sync failed:\n{e}\n\n{kept}")
+        else:
+            messagebox.showerror("Error", f"❌ Sync failed, nothing was changed:\n{e}")
+
+    counts = Counter()  # the cumulative "unchanged" (not in the result tuple) comes from here
+    if batch is None:
+        run = lambda task: sync_csv_to_db(file_paths[0], mode, task=task, dry_run=dry_run, resume=resume,
+                                          counts=counts)
+    else:
+        run = lambda task: sync_csv_files_to_db(file_paths, mode, task=task, dry_run=dry_run, counts=counts)
+
+    # the sync runs on the executor's writer thread; the window stays responsive
+    _current_sync = get_executor().submit(
+        run,
+        on_done=lambda result: _show_sync_result(mode, result, tree, lbl_stats, progress_bar, dry_run,
+                                                 counts["unchanged"]),
+        on_progress=on_progress,
+        on_cancelled=on_cancelled,
+        on_error=on_error,
+        writer=True,
+        name="sync_csv_to_db",
+    )
+    return _current_sync
+
+
+def cancel_sync():
+    if _current_sync is not None and not _current_sync.done():
+        _current_sync.cancel()
+
+
+def sync_running():
+    return _current_sync is not None and not _current_sync.done()
+
 
-    stats_text = f"🆕 Inserted: {inserted} | 🔁 Updated: {updated}"
+def _show_sync_result(mode, result, tree, lbl_stats, progress_bar=None, dry_run=False, unchanged=0):
+    inserted, updated, deleted, skipped, errors, result_rows = result
+    conflicts = sum(1 for r in result_rows if r[2].startswith("conflict"))
+    if progress_bar:
+        progress_bar.config(value=100)
+
+    stats_text = "📝 Plan: " if dry_run else ""
+    stats_text += f"🆕 Inserted: {inserted} | 🔁 Updated: {updated} | = Unchanged: {unchanged}"
     if mode == "update":
         stats_text += f" | 🗑️ Deleted: {deleted} | ⏭️ Skipped: {skipped}"
     stats_text += f" | ⚠️ Errors: {errors}"
+    if conflicts:
+        stats_text += f" | ⚔️ Conflicts: {conflicts}"
     
     if lbl_stats:
         lbl_stats.config(text=stats_text)
@@ -219,14 +740,19 @@ def select_file_sync(mode="update", tree=None, lbl_file=None, lbl_stats=None):
         refresh_tree(tree, result_rows)
 
     # --- Result message ---
-    result_msg = f"✅ Operation completed successfully.\n\n🆕 Inserted: {inserted}\n🔁 Updated: {updated}\n"
+    if dry_run:
+        result_msg = "📝 Plan only: nothing was changed. The sync would do:\n\n"
+    else:
+        result_msg = "✅ Operation completed successfully.\n\n"
+    result_msg += f"🆕 Inserted: {inserted}\n🔁 Updated: {updated}\n= Unchanged: {unchanged}\n"
     if mode == "update":
         result_msg += f"🗑️ Deleted: {deleted}\n⏭️ Skipped: {skipped}\n"
-    result_msg += f"⚠️ Errors: {errors}\n\n💡 Tip: Always keep a backup of your database."
-    
-    messagebox.showinfo("Operation Completed", result_msg)
+    result_msg += f"⚠️ Errors: {errors}\n"
+    if conflicts:
+        result_msg += f"⚔️ Codes in several files: {conflicts} (the most recent file won)\n"
+    result_msg += "\n💡 Tip: Always keep a backup of your database."
     
-    return inserted, updated, deleted, skipped, errors
+    messagebox.showinfo("Sync Plan" if dry_run else "Operation Completed", result_msg)
 
 
 #  ------------------ Main Window Function (can be called from other scripts) ------------------ #
@@ -244,7 +770,8 @@ def open_csv_manager(parent=None, reload_callback=None): # ✅ إضافة reload
         root = tb.Window(themename="litera") # يمكن تغيير "litera" ليتناسب مع ذوقك
         
     root.title("📦 Inventory CSV Manager")
-    root.geometry("800x600")
+    root.geometry("800x660")
+    get_executor(root)  # no-op when the main window already created it
 
     # ✅ لا حاجة لإعداد الأنماط يدوياً (مثل style.configure)
     # ❌ تم إزالة: style = ttk.Style() و style.theme_use("clam")
@@ -284,6 +811,8 @@ def open_csv_manager(parent=None, reload_callback=None): # ✅ إضافة reload
     lbl_file.pack()
     lbl_stats = tb.Label(tab_main, text="", font=("Segoe UI", 10, "bold"))
     lbl_stats.pack(pady=5)
+    progress = tb.Progressbar(tab_main, mode="determinate", maximum=100, bootstyle="success-striped")
+    progress.pack(fill="x", padx=20)
 
     # ----- Treeview to Display Results ----- #
     frame_tree = tb.Frame(tab_main)
@@ -294,7 +823,7 @@ def open_csv_manager(parent=None, reload_callback=None): # ✅ إضافة reload
     tree_main.heading("index", text="#")
     tree_main.heading("code", text="Code")
     tree_main.heading("status", text="Status")
-    tree_main.column("index", width=60)
+    tree_main.column("index", width=120)  # batch imports show "<file>:<line>"
     tree_main.column("code", width=180)
     tree_main.column("status", width=250)
     tree_main.pack(side="left", expand=True, fill="both")
@@ -309,7 +838,7 @@ def open_csv_manager(parent=None, reload_callback=None): # ✅ إضافة reload
     btn_copy = tb.Button(
         btn_frame,
         text="📥 Add/Update Only (Copy)",
-        command=lambda: select_file_sync("copy", tree_main, lbl_file, lbl_stats),
+        command=lambda: select_file_sync("copy", tree_main, lbl_file, lbl_stats, progress),
         width=30,
         bootstyle="success" 
     )
@@ -326,7 +855,7 @@ def open_csv_manager(parent=None, reload_callback=None): # ✅ إضافة reload
     btn_update = tb.Button(
         btn_frame,
         text="🔄 Full Sync (Update)",
-        command=lambda: select_file_sync("update", tree_main, lbl_file, lbl_stats),
+        command=lambda: select_file_sync("update", tree_main, lbl_file, lbl_stats, progress),
         width=30,
         bootstyle="primary" 
     )
@@ -339,13 +868,80 @@ def open_csv_manager(parent=None, reload_callback=None): # ✅ إضافة reload
         bootstyle="secondary"
     ).pack()
 
+    # Dry run of the full sync: same result table, nothing written
+    btn_plan = tb.Button(
+        btn_frame,
+        text="🔎 Preview Full Sync (Plan)",
+        command=lambda: select_file_sync("update", tree_main, lbl_file, lbl_stats, progress, dry_run=True),
+        width=30,
+        bootstyle="info-outline"
+    )
+    btn_plan.pack(pady=5)
+
+    # Batch import (Copy mode): many supplier files in one sync, parsed in parallel
+    batch_frame = tb.Frame(btn_frame)
+    batch_frame.pack(pady=5)
+    tb.Button(
+        batch_frame,
+        text="📚 Batch Add/Update (Files)",
+        command=lambda: select_file_sync("copy", tree_main, lbl_file, lbl_stats, progress, batch="files"),
+        width=24,
+        bootstyle="success-outline"
+    ).pack(side="left", padx=3)
+    tb.Button(
+        batch_frame,
+        text="📁 Batch Add/Update (Folder)",
+        command=lambda: select_file_sync("copy", tree_main, lbl_file, lbl_stats, progress, batch="folder"),
+        width=24,
+        bootstyle="success-outline"
+    ).pack(side="left", padx=3)
+
+    # Cancel a running sync (a single file stops at its last checkpoint, a batch after its last whole file)
+    tb.Button(
+        btn_frame,
+        text="⏹ Cancel Sync",
+        command=cancel_sync,
+        width=30,
+        bootstyle="danger-outline"
+    ).pack(pady=5)
+
     def on_closing():
+        if sync_running():
+            messagebox.showwarning("Busy", "⏳ Please wait for the sync to finish (or cancel it).")
+            return
         if reload_callback:
             reload_callback()
         root.destroy()
         
     root.protocol("WM_DELETE_WINDOW", on_closing)
 
+    # An import that didn't finish last time (app closed, crash) → offer to continue it
+    def offer_resume():
+        journal = get_repository().pending_import()
+        if journal is None or sync_running():
+            return
+        if resumable_import() is None:
+            messagebox.showinfo(
+                "Unfinished sync",
+                f"ℹ️ {_journal_text(journal)}\n\n"
+                "The file is gone or has changed since, so it can't be resumed. "
+                "Rows up to the last checkpoint are saved; run the sync again to finish it.",
+                parent=root,
+            )
+            get_repository().abandon_imports()
+            return
+        if messagebox.askyesno(
+            "Resume sync?",
+            f"⏯ {_journal_text(journal)}\n\nContinue from the last checkpoint?",
+            parent=root,
+        ):
+            _start_sync([journal["path"]], journal["path"], journal["mode"], tree_main, lbl_file, lbl_stats,
+                        progress, resume=True)
+        else:
+            get_repository().abandon_imports()
+
+    root.after(100, offer_resume)
+
     # 4. إزالة استدعاءات mainloop المكررة وغير الضرورية
     if not parent:
         root.mainloop()
@@ -88,8 +88,7 @@ def open_add_window(root, load_data_func, tree, search_term, stat_vars):
                 messagebox.showerror("Error", f"❌ {msg}")
                 return
                 
-            win.destroy()
-            load_data_func(tree, search_term, stat_vars)
+            win.destroy()  # the main tree picks up the new row from the ProductStore event
             messagebox.showinfo("Success", "✅ Product added successfully.")
         except ValueError as e:
             messagebox.showerror("Error", f"Please enter valid numeric values.\n{e}")
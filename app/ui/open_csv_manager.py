@@ -1,15 +1,17 @@
 
 
-import app.ui.inventory_csv_manager 
+from app.utils.product_store import get_store
 
 def open_csv_manager(root, load_data_func, tree, search_term, stat_vars):
     """Opens the CSV Manager as a child window and reloads data upon closing/completion."""
 
     #    1. define the callback function
     def reload_main_data():
-        load_data_func(tree, search_term, stat_vars)
+        # a sync touches many rows → drop the in-memory catalogue; every view reloads
+        get_store().reload()
         
     # 2. pass the parent window and callback function to the child window
+    import app.ui.inventory_csv_manager  # loaded on first use, not at startup
     app.ui.inventory_csv_manager.open_csv_manager(
         parent=root, 
         reload_callback=reload_main_data 
@@ -5,9 +5,10 @@ import tkinter as tk
 from tkinter import messagebox
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
-import sqlite3
-from app.constants.index import column_display_names as COLUMNS_DATA, EDITABLE_FIELDS
-from app.utils.data_handlers import fetch_products, fetch_product_by_id, update_product_full
+from app.constants.index import COLUMNS, column_display_names as COLUMNS_DATA, EDITABLE_FIELDS
+from app.utils.data_handlers import fetch_product_by_id
+from app.utils.product_store import get_store, RELOADED, SUMMARY
+from app.utils.search_index import ProductSearchIndex
 
 # ------------------
 #  define the main window function
@@ -118,20 +119,79 @@ def open_product_manager_window(root, load_data_func, main_tree, search_term, st
         entries_vars["description"].set("")
         entries_vars["total_qty"].set("0")
 
-    # B. Update mini tree
-    def update_mini_tree(event=None, *args):
+    # B. Update mini tree (prefix index over the shared in-memory ProductStore, no SQL)
+    store = get_store()
+    index = ProductSearchIndex(store)  # built once per window, kept current by store events
+    record_idx = [COLUMNS.index(col) for col in COLUMNS_DATA]
+    pending = {"after_id": None, "full": False, "ids": set()}  # redraws waiting for the next idle
+
+    def rebuild_mini_tree():
         mini_tree.delete(*mini_tree.get_children())
         search = search_var.get()
-        rows = fetch_products(search)
-
-        COLUMNS_KEYS = list(COLUMNS_DATA.keys())
+        records = store.records
 
-        for idx, r in enumerate(rows):
+        for idx, pid in enumerate(index.search(search)):
             tag = "evenrow" if idx % 2 == 0 else "oddrow"
-            values = tuple(r[col] for col in COLUMNS_KEYS)
-            mini_tree.insert("", "end", values=values, tags=(tag,))
+            values = tuple(records[pid][i] for i in record_idx)
+            mini_tree.insert("", "end", iid=str(pid), values=values, tags=(tag,))
+
+    def patch_mini_tree(product_ids):
+        """Re-draw only product_ids: update/insert the rows that match the search, drop the others."""
+        search = search_var.get()
+        for pid in product_ids:
+            iid = str(pid)
+            rec = store.records.get(pid)
+            if rec is None or not index.matches(pid, search):
+                if mini_tree.exists(iid):
+                    mini_tree.delete(iid)
+                continue
+            values = tuple(rec[i] for i in record_idx)
+            if mini_tree.exists(iid):
+                mini_tree.item(iid, values=values)
+            else:
+                # keep id order: insert before the first row with a bigger id
+                children = mini_tree.get_children()
+                idx = next((i for i, c in enumerate(children) if int(c) > pid), len(children))
+                tag = "evenrow" if idx % 2 == 0 else "oddrow"
+                mini_tree.insert("", idx, iid=iid, values=values, tags=(tag,))
+
+    def redraw_pending():
+        pending["after_id"] = None
+        ids, pending["ids"] = pending["ids"], set()
+        if pending["full"]:
+            pending["full"] = False
+            rebuild_mini_tree()
+        elif ids:
+            patch_mini_tree(ids)
+
+    def update_mini_tree(*args, product_id=None):
+        """Schedule a redraw: of product_id's row only, else of the whole tree (one per idle)."""
+        if product_id is None:
+            pending["full"] = True
+        else:
+            pending["ids"].add(product_id)
+        if pending["after_id"] is None:
+            pending["after_id"] = win.after_idle(redraw_pending)
 
     search_var.trace_add("write", update_mini_tree)
+
+    # stay in sync with writes made anywhere (this window, the main grid, ...)
+    def on_store_change(kind, product_id):
+        if kind == SUMMARY:
+            return
+        index.apply(kind, product_id)
+        update_mini_tree(product_id=None if kind == RELOADED else product_id)
+
+    unsubscribe = store.subscribe(on_store_change)
+
+    def on_destroy(event):
+        if event.widget is not win:
+            return
+        unsubscribe()
+        if pending["after_id"] is not None:
+            win.after_cancel(pending["after_id"])
+
+    win.bind("<Destroy>", on_destroy)
     search_entry.bind("<Return>", lambda e: mini_tree.focus_set())
 
     # C. Populate form for edit
@@ -176,59 +236,24 @@ def open_product_manager_window(root, load_data_func, main_tree, search_term, st
         data["total_qty"] = good + damaged + gift
         entries_vars["total_qty"].set(data["total_qty"])
 
-        # 🔍 check if product with same code exists
-        conn = sqlite3.connect("inventory.db")
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM products WHERE code = ?", (data["code"],))
-        existing = cur.fetchone()
+        # 🔁 add to an existing product in one atomic UPDATE ... RETURNING, otherwise insert it
+        existing = get_store().increment_or_insert(
+            data["code"],
+            {"good_qty": good, "damaged_qty": damaged, "gift": gift,
+             "note": data["note"], "description": data["description"]},
+            data,
+        )
 
         if existing:
-            # update quantities
-            updated_good = int(existing["good_qty"] or 0) + good
-            updated_damaged = int(existing["damaged_qty"] or 0) + damaged
-            updated_gift = int(existing["gift"] or 0) + gift
-            updated_total = updated_good + updated_damaged + updated_gift
-
-            cur.execute(
-                """
-                UPDATE products
-                SET good_qty=?, damaged_qty=?, gift=?, total_qty=?, note=?, description=?
-                WHERE code=?
-                """,
-                (
-                    updated_good,
-                    updated_damaged,
-                    updated_gift,
-                    updated_total,
-                    data["note"],
-                    data["description"],
-                    data["code"],
-                ),
-            )
-            conn.commit()
             messagebox.showinfo("Updated", f"🔁 Updated quantities for product ({data['code']}).")
         else:
-            # insert new product
-            cur.execute(
-                """
-                INSERT INTO products 
-                (name, code, description, cost, retail, required_qty, good_qty, damaged_qty, gift, total_qty, note)
-                VALUES (:name, :code, :description, :cost, :retail, :required_qty, :good_qty, :damaged_qty, :gift, :total_qty, :note)
-                """,
-                data,
-            )
-            conn.commit()
             messagebox.showinfo("Success", f"✅ Added new product: {data['description']}")
 
-        conn.close()
-
-        load_data_func(main_tree, search_term.get(), stat_vars)
-        update_mini_tree()
+        # main grid and mini tree are refreshed by their ProductStore subscriptions
         clear_form_for_new()
 
     # Key bindings
     win.bind("<Escape>", lambda e: win.destroy())
-    update_mini_tree()
+    rebuild_mini_tree()
     clear_form_for_new()
 
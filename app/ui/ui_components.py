@@ -3,15 +3,16 @@ import tkinter as tk
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
 from app.constants.index import COLUMNS,column_display_names,FONT
+from app.ui.virtual_grid import VirtualGrid
 
 # -------------------------
 # UI Setup Functions
 # -------------------------
 
 def setup_main_window():
-    app = tb.Window(title="Inventory Management System", themename="flatly", size=(1400, 800))
+    # one theme build: creating "flatly" and then switching to "superhero" styled every widget class twice
+    app = tb.Window(title="Inventory Management System", themename="superhero", size=(1400, 800))
     root = app
-    style = tb.Style(theme="superhero")
     return app, root
 
 def setup_header(root):
@@ -64,7 +65,11 @@ def setup_stats_frame(container):
     stat_vars = (stat_req_val, stat_good_val, stat_dam_val, stat_gift_val, stat_tot_val)
     return stats_frame, stat_vars
 
-def setup_treeview(container):
+def setup_treeview(container, virtual=False):
+    """
+    virtual=True → the tree only holds the rows on screen; a VirtualGrid (tree.virtual_grid)
+    fetches pages as the scrollbar moves and load_data() delegates to it.
+    """
     columns = tuple(COLUMNS)
     tree_frame = tb.Frame(container)
     tree_frame.pack(fill="both", expand=True)
@@ -74,7 +79,10 @@ def setup_treeview(container):
     # Scrollbars
     vsb = tb.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
     hsb = tb.Scrollbar(tree_frame, orient="horizontal", command=tree.xview)
-    tree.configure(yscroll=vsb.set, xscroll=hsb.set)
+    if virtual:
+        tree.configure(xscroll=hsb.set)  # vertical scrolling is driven by the VirtualGrid
+    else:
+        tree.configure(yscroll=vsb.set, xscroll=hsb.set)
     vsb.pack(side="right", fill="y")
     hsb.pack(side="bottom", fill="x")
     tree.pack(fill="both", expand=True)
@@ -111,4 +119,6 @@ def setup_treeview(container):
     tree.tag_configure('evenrow', background='#e7e7e7', font=("Arial", 11) ,foreground='#000')
     tree.tag_configure('oddrow', background='#ffffff', font=("Arial", 11) ,foreground='#000')
 
+    tree.virtual_grid = VirtualGrid(tree, vsb, columns) if virtual else None
+
     return tree, style
\ No newline at end of file
@@ -0,0 +1,253 @@
+# virtual_grid.py
+import bisect
+from collections import OrderedDict
+
+from app.constants.index import COLUMNS
+from app.utils.data_handlers import _format_cell_value
+from app.utils.product_repository import get_repository
+
+PAGE_SIZE = 200        # rows fetched per keyset page
+MAX_CACHED_PAGES = 50  # ~10k formatted rows kept in memory
+
+
+class VirtualGrid:
+    """
+    Virtual scrolling on top of a ttk Treeview.
+
+    Only the ids of the current result are held in memory (one index-only query).
+    The Treeview contains just the rows that fit on screen; scrolling re-renders
+    that window from pages fetched with keyset pagination and cached (LRU).
+
+    Treeview item ids are the product ids (as str), so code holding an item id
+    (selection, cell editor) holds a logical row id that survives scrolling.
+    """
+
+    def __init__(self, tree, vsb, columns=None):
+        self.tree = tree
+        self.vsb = vsb
+        self.columns = list(columns or COLUMNS)
+        self.repo = get_repository()
+
+        self.search = ""
+        self.mode = "prefix"
+        self.ids = []           # product ids of the result, in id order
+        self._pos = {}          # product id → index in self.ids
+        self.first = 0          # index of the top rendered row
+        self.rows = 1           # rows that fit in the widget
+        self._pages = OrderedDict()  # page number → {product id: values}
+        self._edits = {}        # product id → values edited in place (win over cached pages)
+
+        vsb.configure(command=self.yview)
+        tree.bind("<Configure>", self._on_configure, add="+")
+        tree.bind("<MouseWheel>", self._on_wheel, add="+")
+        tree.bind("<Button-4>", lambda e: self.scroll(-3) or "break", add="+")
+        tree.bind("<Button-5>", lambda e: self.scroll(3) or "break", add="+")
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"),
+                          ("<Home>", "home"), ("<End>", "end")):
+            tree.bind(key, lambda e, s=step: self._on_key(s), add="+")
+
+    # -------------------------
+    # Data
+    # -------------------------
+    def load(self, search="", mode="prefix"):
+        """Re-run the query; keeps the scroll position (clamped) and the selected row if it is still there."""
+        self.show_ids(search, self.repo.ids(search, mode), mode)
+
+    def show_ids(self, search, ids, mode="prefix"):
+        """Show a result whose ids were already queried (e.g. on a worker thread)."""
+        selected = self.selected_id()
+        self.search, self.mode = search, mode
+        self.ids = ids
+        self._pos = {pid: i for i, pid in enumerate(self.ids)}
+        self._pages.clear()
+        self._edits.clear()
+        self.first = self._clamp(self.first)
+        self.render(select=selected)
+
+    def refresh_rows(self, product_ids):
+        """
+        Re-read only product_ids: changed rows are updated in place, rows that no longer
+        exist (or no longer match the search) are dropped, new matching rows are inserted.
+        """
+        fresh = {r["id"]: r for r in self.repo.fetch_by_ids(product_ids, self.search, self.mode)}
+        reshaped = False
+        for pid in {int(p) for p in product_ids}:
+            self._edits.pop(pid, None)
+            r = fresh.get(pid)
+            if r is None:
+                if pid in self._pos:
+                    del self.ids[bisect.bisect_left(self.ids, pid)]
+                    reshaped = True
+            elif pid in self._pos:
+                page = self._pages.get(self._pos[pid] // PAGE_SIZE)
+                if page is not None:
+                    page[pid] = tuple(_format_cell_value(col, r[col]) for col in self.columns)
+            else:
+                bisect.insort(self.ids, pid)
+                reshaped = True
+        if reshaped:
+            # positions shifted → page boundaries changed
+            self._pos = {pid: i for i, pid in enumerate(self.ids)}
+            self._pages.clear()
+            self.first = self._clamp(self.first)
+        self.render()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index(self, item):
+        """Position of a logical row (product id or Treeview item id) in the result, or None."""
+        try:
+            return self._pos.get(int(item))
+        except (TypeError, ValueError):
+            return None
+
+    def item_at(self, index):
+        return str(self.ids[index])
+
+    def next_item(self, item, step=1):
+        """Item id `step` rows after `item` (wraps around), or None if item isn't in the result."""
+        i = self.index(item)
+        if i is None or not self.ids:
+            return None
+        return self.item_at((i + step) % len(self.ids))
+
+    def values(self, item):
+        pid = int(item)
+        if pid in self._edits:
+            return self._edits[pid]
+        page = self._page(self._pos[pid] // PAGE_SIZE)
+        return page.get(pid) or (pid,) + ("",) * (len(self.columns) - 1)
+
+    def set_values(self, item, values):
+        """Change a row's displayed values (e.g. after an inline edit) without refetching."""
+        pid = int(item)
+        self._edits[pid] = tuple(values)
+        if self.tree.exists(str(pid)):
+            self.tree.item(str(pid), values=values)
+
+    def _page(self, n):
+        page = self._pages.get(n)
+        if page is not None:
+            self._pages.move_to_end(n)
+            return page
+        after_id = self.ids[n * PAGE_SIZE - 1] if n else None
+        rows = self.repo.page(self.search, after_id=after_id, limit=PAGE_SIZE, mode=self.mode)
+        page = {r["id"]: tuple(_format_cell_value(col, r[col]) for col in self.columns) for r in rows}
+        self._pages[n] = page
+        while len(self._pages) > MAX_CACHED_PAGES:
+            self._pages.popitem(last=False)
+        return page
+
+    # -------------------------
+    # Rendering
+    # -------------------------
+    def _clamp(self, first):
+        return max(0, min(first, len(self.ids) - self.rows))
+
+    def render(self, select=None):
+        """Rebuild the Treeview items for ids[first:first+rows]."""
+        tree = self.tree
+        if select is None:
+            select = self.selected_id()
+        focus = tree.focus()
+        tree.delete(*tree.get_children())
+        for i in range(self.first, min(self.first + self.rows, len(self.ids))):
+            pid = self.ids[i]
+            tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+            tree.insert("", "end", iid=str(pid), values=self.values(pid), tags=(tag,))
+        tree.yview_moveto(0)
+
+        if select is not None and tree.exists(str(select)):
+            tree.selection_set(str(select))
+        if focus and tree.exists(focus):
+            tree.focus(focus)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self.ids)
+        if not total:
+            self.vsb.set(0, 1)
+            return
+        self.vsb.set(self.first / total, min(1.0, (self.first + self.rows) / total))
+
+    def _on_configure(self, event):
+        rows = max(1, event.height // self._style_rowheight() - 1)  # minus the heading row
+        if rows != self.rows:
+            self.rows = rows
+            self.first = self._clamp(self.first)
+            self.render()
+
+    def _style_rowheight(self):
+        style = self.tree.cget("style") or "Treeview"
+        try:
+            return int(self.tree.tk.call("ttk::style", "lookup", style, "-rowheight") or 20)
+        except Exception:
+            return 20
+
+    # -------------------------
+    # Scrolling
+    # -------------------------
+    def scroll_to(self, first):
+        first = self._clamp(first)
+        if first != self.first:
+            self.first = first
+            self.render()
+
+    def scroll(self, rows):
+        self.scroll_to(self.first + rows)
+
+    def see(self, item):
+        """Scroll so the logical row `item` is rendered; returns False if it isn't in the result."""
+        i = self.index(item)
+        if i is None:
+            return False
+        if i < self.first:
+            self.scroll_to(i)
+        elif i >= self.first + self.rows:
+            self.scroll_to(i - self.rows + 1)
+        return True
+
+    def yview(self, *args):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", n, "units" | "pages")."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.ids)))
+        elif args[0] == "scroll":
+            n = int(args[1])
+            self.scroll(n * self.rows if args[2] == "pages" else n)
+
+    def _on_wheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    # -------------------------
+    # Selection
+    # -------------------------
+    def selected_id(self):
+        sel = self.tree.selection()
+        return sel[0] if sel else None
+
+    def select(self, item):
+        if not self.see(item):
+            return
+        self.tree.selection_set(str(item))
+        self.tree.focus(str(item))
+
+    def _on_key(self, step):
+        if not self.ids:
+            return "break"
+        current = self.index(self.tree.focus() or self.selected_id())
+        if current is None:
+            current = self.first
+        if step == "home":
+            target = 0
+        elif step == "end":
+            target = len(self.ids) - 1
+        elif step in ("page", "-page"):
+            target = current + (self.rows if step == "page" else -self.rows)
+        else:
+            target = current + step
+        self.select(self.item_at(max(0, min(target, len(self.ids) - 1))))
+        return "break"
@@ -3,16 +3,24 @@ import tkinter as tk
 from tkinter import messagebox
 import ttkbootstrap as tb
 from app.utils.dp_utils import update_product_full
+from app.utils.write_queue import WriteBehindQueue
+from app.utils.data_handlers import adjust_stats
+from app.utils.product_store import get_store
 
 from app.constants.index import COLUMNS,NUMERIC_FIELDS
 
 _edit_entry = None
 
-def _open_editor_for_item_column(tree, root, item, col_index, EDITABLE_INDEXES, FIRST_EDITABLE_INDEX, load_data_func, search_var, stat_vars):
+def _open_editor_for_item_column(tree, root, item, col_index, EDITABLE_INDEXES, FIRST_EDITABLE_INDEX, load_data_func, search_var, stat_vars, write_queue=None):
     """Open editor for given tree item and column index (0-based)."""
     global _edit_entry
     
-    if item not in tree.get_children(): return
+    grid = getattr(tree, "virtual_grid", None)
+    if grid is not None:
+        # item is a logical row id: scroll it into the rendered window first
+        if not grid.see(item): return
+        tree.update_idletasks()
+    if not tree.exists(item): return
     column_id = f"#{col_index + 1}"
     try:
         bbox = tree.bbox(item, column_id)
@@ -34,8 +42,11 @@ def _open_editor_for_item_column(tree, root, item, col_index, EDITABLE_INDEXES,
     entry.focus()
     entry.select_range(0, tk.END)
 
+    saved = False
+
     def save_and_move(next_on_tab=True):
-        nonlocal entry
+        nonlocal entry, saved
+        if saved: return True  # FocusOut fires again while the entry is being destroyed
         new_raw = entry.get().strip()
         field_name = COLUMNS[col_index]
         print("col_index",col_index)
@@ -56,54 +67,42 @@ def _open_editor_for_item_column(tree, root, item, col_index, EDITABLE_INDEXES,
                 return False
 
         # update tree view row values (in-memory)
-        values = list(tree.item(item, "values"))
+        old_values = list(tree.item(item, "values"))
+        values = list(old_values)
         values[col_index] = new_raw
-        tree.item(item, values=values)
-
-        pd = {}
-        for i, col in enumerate(COLUMNS):
-            v_raw = values[i] # القيمة في الصف، والتي قد تكون جديدة أو قديمة
-                        
-            # 🟢 التأكد من تحويل جميع القيم إلى النوع الصحيح قبل التخزين في القاموس
-            if col == "id":
-                pd[col] = int(v_raw)
-            elif col in ("cost", "retail"): 
-                pd[col] = float(v_raw) if v_raw not in ("", None) else 0.0
-            elif col in ("required_qty", "good_qty", "damaged_qty", "gift"):
-                # نستخدم int(float(v)) للتعامل مع أي أرقام عشرية قد تدخل خطأ
-                pd[col] = int(float(v_raw)) if v_raw not in ("", None) and v_raw != "" else 0
-            else: 
-                pd[col] = v_raw
-        
-        # 🟢 إعادة حساب total_qty
-        pd["total_qty"] = pd.get("good_qty", 0) + pd.get("damaged_qty", 0) + pd.get("gift", 0)
-
-        # 🟢 استدعاء دالة التحديث باستخدام القاموس الموحد
-        ok = update_product_full(pd) # ⬅️ هنا التعديل
-        
-        if not ok:
-            messagebox.showerror("Update Error", "❌ Update failed - duplicate code or DB error.")
-            load_data_func(tree, search_var.get(), stat_vars)
+        saved = True
+
+        if write_queue is not None:
+            # ⚡ optimistic: row, total and stats change on screen now; the write-behind queue
+            # commits in the background and on_write_error puts the DB values back if it fails
+            total_idx = COLUMNS.index("total_qty")
+            values[total_idx] = str(sum(_qty(values, f) for f in ("good_qty", "damaged_qty", "gift")))
+            _set_row_values(tree, item, values)
+            write_queue.submit(values[0], {field_name: new_val if field_name in NUMERIC_FIELDS else new_raw})
+            if stat_vars:
+                adjust_stats(stat_vars, 0, *(_qty(values, f) - _qty(old_values, f)
+                                             for f in ("good_qty", "damaged_qty", "gift", "total_qty")))
             entry.destroy()
-            return False
+        else:
+            _set_row_values(tree, item, values)
+            if not _save_row_now(values):
+                messagebox.showerror("Update Error", "❌ Update failed - duplicate code or DB error.")
+                load_data_func(tree, search_var.get(), stat_vars, dirty_ids={values[0]})
+                entry.destroy()
+                return False
 
-        entry.destroy()
-        # reload to reflect formatting & summaries
-        root.after(50, lambda: load_data_func(tree, search_var.get(), stat_vars))
+            entry.destroy()  # the store's change events refresh the row (formatting) and the summaries
 
         if next_on_tab:
-            try: idx_row = tree.get_children().index(item)
-            except ValueError: return True
+            next_item = _next_row(tree, item)
+            if next_item is None: return True
             
             editable_after = [i for i in EDITABLE_INDEXES if i > col_index]
             if editable_after:
                 next_col = editable_after[0]
-                root.after(120, lambda: _open_editor_for_item_column(tree, root, item, next_col, EDITABLE_INDEXES, FIRST_EDITABLE_INDEX, load_data_func, search_var, stat_vars))
+                root.after_idle(lambda: _open_editor_for_item_column(tree, root, item, next_col, EDITABLE_INDEXES, FIRST_EDITABLE_INDEX, load_data_func, search_var, stat_vars, write_queue))
             else:
-                cur_row_children = tree.get_children()
-                next_row_idx = (idx_row + 1) % len(cur_row_children)
-                next_item = cur_row_children[next_row_idx]
-                root.after(120, lambda: _open_editor_for_item_column(tree, root, next_item, FIRST_EDITABLE_INDEX, EDITABLE_INDEXES, FIRST_EDITABLE_INDEX, load_data_func, search_var, stat_vars))
+                root.after_idle(lambda: _open_editor_for_item_column(tree, root, next_item, FIRST_EDITABLE_INDEX, EDITABLE_INDEXES, FIRST_EDITABLE_INDEX, load_data_func, search_var, stat_vars, write_queue))
         return True
 
     entry.bind("<Return>", lambda e: save_and_move(next_on_tab=False) or "break")
@@ -114,6 +113,59 @@ def _open_editor_for_item_column(tree, root, item, col_index, EDITABLE_INDEXES,
     _edit_entry = entry
 
 
+def _qty(values, field):
+    try:
+        return int(float(values[COLUMNS.index(field)] or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _set_row_values(tree, item, values):
+    grid = getattr(tree, "virtual_grid", None)
+    if grid is not None:
+        grid.set_values(item, values)  # also survives the row scrolling out and back
+    else:
+        tree.item(item, values=values)
+        shown = getattr(tree, "shown_rows", None)
+        if shown and item in shown:
+            shown[item] = (tuple(values), shown[item][1])  # so a later diff compares against what is on screen
+
+
+def _next_row(tree, item):
+    """Logical row after item (wraps), or None when item is no longer in the result."""
+    grid = getattr(tree, "virtual_grid", None)
+    if grid is not None:
+        return grid.next_item(item)
+    children = tree.get_children()
+    if item not in children:
+        return None
+    return children[(children.index(item) + 1) % len(children)]
+
+
+def _save_row_now(values):
+    """Synchronous save of a whole tree row (used when no write queue is attached)."""
+    pd = {}
+    for i, col in enumerate(COLUMNS):
+        v_raw = values[i] # القيمة في الصف، والتي قد تكون جديدة أو قديمة
+                    
+        # 🟢 التأكد من تحويل جميع القيم إلى النوع الصحيح قبل التخزين في القاموس
+        if col == "id":
+            pd[col] = int(v_raw)
+        elif col in ("cost", "retail"): 
+            pd[col] = float(v_raw) if v_raw not in ("", None) else 0.0
+        elif col in ("required_qty", "good_qty", "damaged_qty", "gift"):
+            # نستخدم int(float(v)) للتعامل مع أي أرقام عشرية قد تدخل خطأ
+            pd[col] = int(float(v_raw)) if v_raw not in ("", None) and v_raw != "" else 0
+        else: 
+            pd[col] = v_raw
+    
+    # 🟢 إعادة حساب total_qty
+    pd["total_qty"] = pd.get("good_qty", 0) + pd.get("damaged_qty", 0) + pd.get("gift", 0)
+
+    # 🟢 استدعاء دالة التحديث باستخدام القاموس الموحد
+    return update_product_full(pd) # ⬅️ هنا التعديل
+
+
 def tree_tab_handler(event):
     """Override Tab behavior in tree to stay within tree"""
     return "break"
@@ -128,6 +180,17 @@ class CellEditorState:
 
 def setup_tree_bindings(tree, root,EDITABLE_FIELDS, FIRST_EDITABLE_INDEX, EDITABLE_INDEXES, load_data_func, search_var, stat_vars):
     state = CellEditorState()
+
+    # Group-commit queue: inline edits are written in the background (stats were already adjusted on screen)
+    def on_flushed(product_ids):
+        get_store().refresh(product_ids)  # publish the committed rows to every open view
+
+    def on_write_error(product_id, changes, exc):
+        # roll the optimistic edit back: re-read the row and the stats from the DB
+        load_data_func(tree, search_var.get(), stat_vars, dirty_ids={product_id})
+        messagebox.showerror("Update Error", f"❌ Update failed for product {product_id}:\n{exc}")
+
+    write_queue = WriteBehindQueue(root, on_flushed=on_flushed, on_error=on_write_error)
     
     def handle_edit_cell(event=None, item=None, col_index=None):
         if item is None or col_index is None:
@@ -138,7 +201,7 @@ def setup_tree_bindings(tree, root,EDITABLE_FIELDS, FIRST_EDITABLE_INDEX, EDITAB
         _open_editor_for_item_column(
             tree, root, 
             item, col_index, EDITABLE_INDEXES, 
-            FIRST_EDITABLE_INDEX, load_data_func, search_var, stat_vars
+            FIRST_EDITABLE_INDEX, load_data_func, search_var, stat_vars, write_queue
         )
     
     # Store the edit state when double-clicking
@@ -169,4 +232,6 @@ def setup_tree_bindings(tree, root,EDITABLE_FIELDS, FIRST_EDITABLE_INDEX, EDITAB
     tree.bind("<Double-1>", on_double_click)
     tree.bind("<Return>", on_tree_key)
     tree.bind("<F2>", on_tree_key)
-    tree.bind("<Tab>", lambda e: "break")
\ No newline at end of file
+    tree.bind("<Tab>", lambda e: "break")
+
+    return write_queue
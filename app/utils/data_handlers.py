@@ -1,7 +1,8 @@
 # data_handlers.py
-from app.utils.dp_utils import fetch_products 
-from app.constants.index import DB_FILE
-import sqlite3
+from app.utils.dp_utils import fetch_products, fetch_summary, fetch_totals
+from app.utils.write_queue import flush_all, any_pending, uncommitted_ids
+from app.utils.product_repository import get_repository
+from app.utils.product_store import get_store, RELOADED, SUMMARY
 # -------------------------
 # Load / Insert helper
 # -------------------------
@@ -17,14 +18,31 @@ def _format_cell_value(col, val):
     return val
 
 def update_stats(stat_vars, total_required, total_good, total_damaged, total_gift, total_stock):
-    stat_req_val, stat_good_val, stat_dam_val, stat_gift_val, stat_tot_val = stat_vars
-    stat_req_val.config(text=f"{total_required:,}")
-    stat_good_val.config(text=f"{total_good:,}")
-    stat_dam_val.config(text=f"{total_damaged:,}")
-    stat_gift_val.config(text=f"{total_gift:,}")
-    stat_tot_val.config(text=f"{total_stock:,}")
+    totals = (total_required, total_good, total_damaged, total_gift, total_stock)
+    for label, total in zip(stat_vars, totals):
+        label.config(text=f"{total:,}")
+        label.total = total  # remembered for adjust_stats()
 
 
+def adjust_stats(stat_vars, d_required=0, d_good=0, d_damaged=0, d_gift=0, d_stock=0):
+    """Add deltas to the numbers on screen (optimistic update after an inline edit, no query)."""
+    current = [getattr(label, "total", 0) for label in stat_vars]
+    deltas = (d_required, d_good, d_damaged, d_gift, d_stock)
+    update_stats(stat_vars, *(c + d for c, d in zip(current, deltas)))
+
+
+def refresh_stats(stat_vars, search="", product_ids=None):
+    """
+    Update only the stats boxes (no grid rebuild). product_ids: the ids the search shows →
+    vectorized totals from the store's NumPy cache when it's built, else one SUM() query.
+    """
+    t = None
+    if product_ids is not None and (search or "").strip():
+        t = get_store().totals(product_ids)
+    if t is None:
+        t = fetch_totals(search)
+    update_stats(stat_vars, t["total_required"], t["total_good"], t["total_damaged"], t["total_gift"], t["total_stock"])
+
 
 # -------------------------
 # وظيفة مساعدة لتحويل آمن
@@ -46,11 +64,43 @@ def safe_int(r, key):
 # -------------------------
 # Load Data
 # -------------------------
-def load_data(tree, search="", stat_vars=None, COLUMNS=None):
+def load_data(tree, search="", stat_vars=None, COLUMNS=None, dirty_ids=None, flush=True):
     """
     تحميل البيانات من قاعدة البيانات إلى Treeview وتحديث الإحصائيات.
+
+    The tree is refreshed in place: only rows that were added, changed, moved or removed
+    are touched, so scroll position and selection survive.
+    dirty_ids: product ids known to have changed → only those rows are re-read.
+    flush=False: don't commit queued inline edits first (store events: those rows are committed
+    already, and flushing here would defeat the write queue's group commit).
     """
-    tree.delete(*tree.get_children())
+    if flush:
+        flush_all()  # pending inline edits must be committed before we re-read the table
+    elif dirty_ids is not None:
+        # rows edited again since: the screen shows the newer (optimistic) value, the DB doesn't
+        # have it yet → leave them, the store event after their own flush redraws them
+        dirty_ids = {int(pid) for pid in dirty_ids} - uncommitted_ids()
+        if not dirty_ids:
+            return
+
+    grid = getattr(tree, "virtual_grid", None)
+    if grid is not None:
+        # virtual mode: only ids are loaded, rows are fetched page by page while scrolling
+        if dirty_ids is not None and grid.search == search:
+            grid.refresh_rows(dirty_ids)
+        else:
+            grid.load(search)
+        if stat_vars:
+            refresh_stats(stat_vars, search, grid.ids)
+        return
+
+    if dirty_ids is not None:
+        rows = get_repository().fetch_by_ids(dirty_ids, search)
+        _patch_tree_rows(tree, rows, dirty_ids, COLUMNS or (rows[0].keys() if rows else []))
+        if stat_vars:
+            refresh_stats(stat_vars, search)
+        return
+
     total_required = total_good = total_damaged = total_gift = total_stock = 0
     
     # يجب التأكد من تمرير COLUMNS في main_app.py
@@ -64,25 +114,132 @@ def load_data(tree, search="", stat_vars=None, COLUMNS=None):
     else:
         rows = fetch_products(search)
     
-    for idx, r in enumerate(rows):
-        tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-        
-        # استخدام COLUMNS لضمان الترتيب الصحيح للأعمدة في الجدول
-        values = tuple(_format_cell_value(col, r[col]) for col in COLUMNS) 
-        
-        tree.insert("", "end", values=values, tags=(tag,))
-        
-        # استخدام الدالة الآمنة لتجميع الإحصائيات
-        total_required += safe_int(r, "required_qty")
-        total_good += safe_int(r, "good_qty")
-        total_damaged += safe_int(r, "damaged_qty")
-        total_gift += safe_int(r, "gift")
-        total_stock += safe_int(r, "total_qty")
+    _sync_tree_rows(tree, rows, COLUMNS)
+
+    # بدون بحث: الإجماليات جاهزة في جدول inventory_summary (O(1)) بدلاً من جمعها صفاً صفاً
+    use_summary = not (search or "").strip()
+
+    # vectorized over the NumPy cache when it's built
+    t = None if use_summary else get_store().totals([r["id"] for r in rows])
+    if t is not None:
+        total_required, total_good, total_damaged, total_gift, total_stock = (
+            t["total_required"], t["total_good"], t["total_damaged"], t["total_gift"], t["total_stock"])
+    elif not use_summary:
+        for r in rows:
+            # استخدام الدالة الآمنة لتجميع الإحصائيات (نتائج البحث فقط)
+            total_required += safe_int(r, "required_qty")
+            total_good += safe_int(r, "good_qty")
+            total_damaged += safe_int(r, "damaged_qty")
+            total_gift += safe_int(r, "gift")
+            total_stock += safe_int(r, "total_qty")
         
     if stat_vars:
+        if use_summary:
+            summary = fetch_summary()
+            total_required = summary["total_required"]
+            total_good = summary["total_good"]
+            total_damaged = summary["total_damaged"]
+            total_gift = summary["total_gift"]
+            total_stock = summary["total_stock"]
         update_stats(stat_vars, total_required, total_good, total_damaged, total_gift, total_stock)
 
 
+# -------------------------
+# Incremental tree refresh
+# -------------------------
+def _shown_rows(tree):
+    """
+    {item id: (values, tag)} of what the tree currently shows. Item ids are product ids,
+    so this is also the product id → row map the diff works from.
+    """
+    shown = getattr(tree, "shown_rows", None)
+    if shown is None or len(shown) != len(tree.get_children()):
+        # first load, or rows were inserted by someone else → start from scratch
+        tree.delete(*tree.get_children())
+        shown = tree.shown_rows = {}
+    return shown
+
+
+def _sync_tree_rows(tree, rows, COLUMNS):
+    """Make the tree show exactly `rows` (in order), touching only rows that differ."""
+    shown = _shown_rows(tree)
+    new_iids = [str(r["id"]) for r in rows]
+    keep = set(new_iids)
+
+    stale = [iid for iid in shown if iid not in keep]
+    if stale:
+        tree.delete(*stale)
+        for iid in stale:
+            del shown[iid]
+
+    # walk the current order with a cursor: rows already in place cost one comparison
+    current = list(tree.get_children())
+    moved = set()
+    j = 0
+    for idx, (iid, r) in enumerate(zip(new_iids, rows)):
+        while j < len(current) and current[j] in moved:
+            j += 1
+        tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
+        row = (tuple(_format_cell_value(col, r[col]) for col in COLUMNS), tag)
+        if j < len(current) and current[j] == iid:
+            j += 1
+        elif iid in shown:
+            tree.move(iid, "", idx)
+            moved.add(iid)
+        else:
+            tree.insert("", idx, iid=iid, values=row[0], tags=(tag,))
+            shown[iid] = row
+            continue
+        if shown[iid] != row:
+            tree.item(iid, values=row[0], tags=(tag,))
+            shown[iid] = row
+
+
+def _patch_tree_rows(tree, rows, dirty_ids, COLUMNS):
+    """Re-draw only dirty_ids: update/insert the rows that still match, drop the others."""
+    shown = _shown_rows(tree)
+    fresh = {str(r["id"]): r for r in rows}
+    for iid in {str(pid) for pid in dirty_ids}:
+        r = fresh.get(iid)
+        if r is None:
+            if iid in shown:
+                tree.delete(iid)
+                del shown[iid]
+            continue
+        values = tuple(_format_cell_value(col, r[col]) for col in COLUMNS)
+        if iid in shown:
+            tag = shown[iid][1]
+            tree.item(iid, values=values)
+        else:
+            # keep id order: insert before the first shown row with a bigger id
+            children = tree.get_children()
+            idx = next((i for i, c in enumerate(children) if int(c) > int(iid)), len(children))
+            tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
+            tree.insert("", idx, iid=iid, values=values, tags=(tag,))
+        shown[iid] = (values, tag)
+
+
+def follow_store(tree, search_var, stat_vars=None, COLUMNS=None):
+    """
+    Keep the tree and the stats in sync with ProductStore change events:
+    changed rows are patched one by one, a reload event triggers a (diffed) full load.
+    Returns the unsubscribe function.
+    """
+    def on_change(kind, product_id):
+        if kind == RELOADED:
+            load_data(tree, search_var.get(), stat_vars, COLUMNS)
+        elif kind == SUMMARY:
+            # while newer edits are queued the optimistic numbers on screen are ahead of the DB;
+            # the summary event after their flush reconciles
+            if stat_vars and not any_pending():
+                grid = getattr(tree, "virtual_grid", None)
+                refresh_stats(stat_vars, search_var.get(), grid.ids if grid is not None else None)
+        else:
+            load_data(tree, search_var.get(), None, COLUMNS, dirty_ids={product_id}, flush=False)
+
+    return get_store().subscribe(on_change)
+
+
 def search_products(tree, search_var, FIRST_EDITABLE_INDEX):
     """Focus first row in tree and optionally start editing."""
     search = search_var.get()
@@ -108,30 +265,14 @@ def search_products(tree, search_var, FIRST_EDITABLE_INDEX):
 
 def update_product_full(product_id, data):
 
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     try:
-        c.execute("""
-            UPDATE products SET
-               
-                total_qty = ?, good_qty = ?, damaged_qty = ?, gift = ?, note = ?
-            WHERE id = ?
-        """, (
-            data['total_qty'], data['good_qty'], data['damaged_qty'], data['gift'], data['note'],
-            product_id
-        ))
-        conn.commit()
+        get_store().update_fields(product_id, {
+            "good_qty": data['good_qty'], "damaged_qty": data['damaged_qty'], "gift": data['gift'], "note": data['note'],
+        })
         print ("updated")
-        conn.close()
     except Exception as e:
         print (e)
 
 
 def fetch_product_by_id(product_id):
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-    row = c.fetchone()
-    conn.close()
-    return row # سيعيد كائن sqlite3.Row
\ No newline at end of file
+    return get_store().get(product_id) # سيعيد قاموس (dict) من الـ ProductStore، أو None
\ No newline at end of file
@@ -0,0 +1,196 @@
+# db_manager.py
+import atexit
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from app.constants.index import DB_FILE
+
+# -------------------------
+# Connection tuning
+# -------------------------
+READ_POOL_SIZE = 4
+CACHE_SIZE_KB = 64 * 1024           # 64 MB page cache per connection
+MMAP_SIZE = 256 * 1024 * 1024       # 256 MB memory-mapped I/O
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 1024         # compiled statements kept per connection
+CANCEL_CHECK_STEPS = 1000           # VM instructions between cancel checks (see cancel_scope)
+
+
+class ConnectionManager:
+    """
+    Keeps one long-lived writer connection and a small pool of reader
+    connections to the same SQLite file, all tuned once at open time.
+
+    - write: `with db.transaction() as conn:` (serialized, BEGIN IMMEDIATE, nested calls use SAVEPOINTs)
+    - read:  `with db.reader() as conn:`      (pooled, autocommit, sees last committed state)
+    """
+
+    def __init__(self, db_file=DB_FILE, pool_size=READ_POOL_SIZE):
+        self.db_file = db_file
+        self.pool_size = pool_size
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._readers = queue.LifoQueue()
+        self._readers_created = 0
+        self._pool_lock = threading.Lock()
+        self._savepoint_depth = 0
+        self._closed = False
+        self._local = threading.local()  # per-thread cancel token, see cancel_scope()
+
+    # -------------------------
+    # Connection setup
+    # -------------------------
+    def _connect(self):
+        # isolation_level=None → autocommit; transactions are opened explicitly in transaction()
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @property
+    def writer(self):
+        if self._writer is None:
+            with self._write_lock:
+                if self._writer is None:
+                    conn = self._connect()
+                    # WAL is persistent in the file; readers never block the writer and vice versa
+                    conn.execute("PRAGMA journal_mode = WAL")
+                    self._writer = conn
+        return self._writer
+
+    # -------------------------
+    # Transactions (writer)
+    # -------------------------
+    @contextmanager
+    def transaction(self):
+        """Run the block in one transaction on the writer connection; commit on success, rollback on error."""
+        with self._write_lock:
+            conn = self.writer
+            if conn.in_transaction:
+                # nested call → savepoint, so helpers can be composed inside a bigger transaction
+                self._savepoint_depth += 1
+                name = f"sp_{self._savepoint_depth}"
+                conn.execute(f"SAVEPOINT {name}")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute(f"ROLLBACK TO {name}")
+                    conn.execute(f"RELEASE {name}")
+                    raise
+                else:
+                    conn.execute(f"RELEASE {name}")
+                finally:
+                    self._savepoint_depth -= 1
+                return
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    # -------------------------
+    # Reader pool
+    # -------------------------
+    def _acquire_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if self._readers_created < self.pool_size:
+                self._readers_created += 1
+                return self._connect()
+        return self._readers.get()  # pool exhausted → wait for a free connection
+
+    @contextmanager
+    def reader(self):
+        """Borrow a pooled read connection for the duration of the block."""
+        conn = self._acquire_reader()
+        cancel = getattr(self._local, "cancel", None)
+        if cancel is not None:
+            # checked every N VM steps: a set event aborts the running statement
+            conn.set_progress_handler(cancel.is_set, CANCEL_CHECK_STEPS)
+        try:
+            yield conn
+        finally:
+            if cancel is not None:
+                conn.set_progress_handler(None, 0)
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+
+    @contextmanager
+    def cancel_scope(self, event):
+        """
+        Reads made by this thread inside the block are aborted as soon as `event` is set
+        (they raise sqlite3.OperationalError: interrupted).
+        """
+        previous = getattr(self._local, "cancel", None)
+        self._local.cancel = event
+        try:
+            yield
+        finally:
+            self._local.cancel = previous
+
+    # -------------------------
+    # Shutdown
+    # -------------------------
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._write_lock:
+            if self._writer is not None:
+                try:
+                    self._writer.execute("PRAGMA optimize")
+                finally:
+                    self._writer.close()
+                    self._writer = None
+
+
+# -------------------------
+# Shared instance
+# -------------------------
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_db():
+    """Return the process-wide ConnectionManager (created on first use)."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ConnectionManager()
+                atexit.register(_manager.close)
+    return _manager
+
+
+def close_db():
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+            _manager = None
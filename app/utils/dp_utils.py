@@ -1,6 +1,8 @@
 import sqlite3
 # from constants import DB_FILE
-from app.constants.index import DB_FILE
+from app.utils.migrations import migrate
+from app.utils.product_repository import get_repository, SEARCH_MODES, SORT_COLUMNS
+from app.utils.product_store import get_store
 
 # -------------------------
 # Database helpers
@@ -9,104 +11,100 @@ from app.constants.index import DB_FILE
 from tkinter import messagebox
 
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            code TEXT UNIQUE,
-            description TEXT,
-            cost REAL,
-            retail REAL,
-            required_qty INTEGER,
-            good_qty INTEGER,
-            damaged_qty INTEGER,
-            total_qty INTEGER,
-            gift INTEGER,
-            note TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-
-
-def fetch_products(search_text=""):
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    if search_text:
-        q = f"%{search_text}%"
-        c.execute("""
-            SELECT * FROM products
-            WHERE name LIKE ? OR description LIKE ? OR code LIKE ?
-            ORDER BY id ASC
-        """, (q, q, q))
-    else:
-        c.execute("SELECT * FROM products ORDER BY id ASC")
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    """Bring the schema up to date (a single PRAGMA read when it already is)."""
+    migrate()
+    get_repository().reset_schema_cache()
+
+
+# -------------------------
+# Inventory summary
+# -------------------------
+def fetch_summary():
+    """
+    Return the inventory totals as a dict:
+    {"product_count", "total_required", "total_good", "total_damaged", "total_gift", "total_stock"}
+    """
+    return get_repository().summary()
+
+
+def fetch_totals(search_text="", mode="prefix"):
+    """
+    Totals for the stats boxes: the summary row when there's no search,
+    otherwise one SUM() over the matching rows. Same keys as fetch_summary().
+    """
+    return get_repository().totals(search_text, mode)
+
+
+# -------------------------
+# Search / queries
+# -------------------------
+def fts_available():
+    return get_repository().fts_available()
+
+
+def fetch_products(search_text="", mode="prefix"):
+    """
+    mode: "prefix" → FTS5 token-prefix search (default, used by search-as-you-type)
+          "token"  → FTS5 whole-token search
+          "like"   → legacy substring scan; also used automatically when FTS5 is missing
+    """
+    return get_repository().fetch(search_text, mode)
+
+
+def fetch_products_page(search="", after_id=None, limit=200, order_by="id", mode="prefix", **kwargs):
+    """
+    Keyset pagination: return up to `limit` rows sorted by (order_by, id) that come
+    after the row `after_id` (None → first page). Pass the last row's id of a page to get
+    the next one; cost is O(limit) no matter how deep the page is (no OFFSET scan).
+
+    For order_by other than "id" the sort value of after_id is looked up, or can be
+    given as after_key (needed if that row may have been deleted in the meantime).
+    """
+    return get_repository().page(search, after_id, limit, order_by, mode, **kwargs)
+
+
+def iter_products(search="", order_by="id", chunk_size=1000, mode="prefix"):
+    """
+    Generator variant: stream matching rows from one cursor, `chunk_size` rows at a time,
+    so callers (exports, bulk jobs) never hold the whole table in memory.
+    The pooled read connection is returned when the generator is exhausted or closed.
+    """
+    return get_repository().iter(search, order_by, chunk_size, mode)
+
+
+def iter_mismatched_products(chunk_size=1000):
+    """Stream products whose required_qty != total_qty (served by the idx_products_mismatch partial index)."""
+    return get_repository().iter_mismatched(chunk_size)
+
 
 def get_product_by_id(prod_id):
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT * FROM products WHERE id=?", (prod_id))
-    row = c.fetchone()
-    conn.close()
-    return row
+    return get_repository().get_by_id(prod_id)
 
 
-def update_product_full(data_dict): 
+# -------------------------
+# Writes (through the ProductStore, so open views get change events)
+# -------------------------
+def update_product_full(data_dict):
     """
     Update product fields. If total_qty is None it's computed as good+damaged+gift.
     Returns True on success, False on unique-code violation or error.
     """
-
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
     try:
-        c.execute("""
-            UPDATE products SET
-                name = ?, code = ?, description = ?, cost = ?, retail = ?,
-                required_qty = ?, good_qty = ?, damaged_qty = ?, gift = ?,
-                total_qty = ?, note = ?
-            WHERE id = ?
-        """, (
-            data_dict["name"], data_dict["code"], data_dict["description"],
-            data_dict["cost"], data_dict["retail"],
-            data_dict["required_qty"], data_dict["good_qty"], data_dict["damaged_qty"],
-            data_dict["gift"], data_dict["total_qty"], data_dict["note"],
-            data_dict["id"] # ID هو مفتاح التحديث
-        ))
-        conn.commit()
-        return True
+        return get_store().update(data_dict)
     except sqlite3.IntegrityError:
-        
+
         return False
     except Exception as e:
         # print(f"DB Error during update: {e}")
         return False
-    finally:
-        conn.close()
 
 def insert_product(data_tuple):
     """
     data_tuple: (name, code, description, cost, retail, required_qty, good_qty, damaged_qty, total_qty, gift, note)
     """
+    keys = ("name", "code", "description", "cost", "retail", "required_qty", "good_qty", "damaged_qty", "total_qty", "gift", "note")
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        # (name, code, description, cost, retail, required_qty, good_qty, damaged_qty, total_qty, gift, note)
-        c.execute("""
-            INSERT INTO products (name, code, description, cost, retail, required_qty, good_qty, damaged_qty, total_qty, gift, note)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, data_tuple)
-        conn.commit()
-        conn.close()
+        get_store().insert(dict(zip(keys, data_tuple)))
         return True, "Product added successfully!"
     except sqlite3.IntegrityError:
         return False, "Product code already exists!"
@@ -118,42 +116,46 @@ def delete_product(prod_id):
         messagebox.showerror("Error", "Product ID is required!")
         return False
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("DELETE FROM products WHERE id=?", (prod_id,))  # Note the comma after prod_id
-        conn.commit()
-        conn.close()
+        get_store().delete(prod_id)
         return True
     except Exception as e:
         messagebox.showerror("Error", f"Error deleting product: {e}")
         return False
 
+
+# -------------------------
+# Atomic quantity increments
+# -------------------------
+def increment_product_quantities(key, good_qty=0, damaged_qty=0, gift=0, note=None, description=None, by="id"):
+    """
+    Add to a product's quantities in one UPDATE ... RETURNING statement: the new values
+    and total_qty are computed by SQLite from the current row, so concurrent callers
+    can't lose each other's increments. note/description are overwritten only when given.
+
+    by: "id" or "code". Returns the updated sqlite3.Row (id, code, good_qty, damaged_qty,
+    gift, total_qty, note) or None if no product matches.
+    """
+    deltas = {"good_qty": good_qty, "damaged_qty": damaged_qty, "gift": gift, "note": note, "description": description}
+    return get_store().increment_batch([(key, deltas)], by=by)[0]
+
+
+def increment_products_batch(items, by="code"):
+    """
+    items: iterable of (key, deltas) where deltas is a dict with any of
+           good_qty, damaged_qty, gift (added) and note, description (overwritten).
+    All increments run in a single transaction. Returns one result per item,
+    in order: the updated row, or None for keys that don't exist.
+    """
+    return get_store().increment_batch(items, by=by)
+
+
 def update_product_quantities(prod_id, good_qty_to_add=0, damaged_qty_to_add=0, gift_to_add=0, note_to_add=None):
     """
     Add quantities to existing product. Returns tuple (new_good, new_damaged, new_gift, new_note) or None on failure.
     """
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute("SELECT good_qty, damaged_qty, gift, note FROM products WHERE id=?", (prod_id,))
-    current = c.fetchone()
-    if not current:
-        conn.close()
+    row = increment_product_quantities(
+        prod_id, good_qty_to_add, damaged_qty_to_add, gift_to_add, note=note_to_add
+    )
+    if row is None:
         return None
-    cur_good = int(current["good_qty"] or 0)
-    cur_damaged = int(current["damaged_qty"] or 0)
-    cur_gift = int(current["gift"] or 0)
-    cur_note = current["note"] or ""
-    new_good = cur_good + (good_qty_to_add or 0)
-    new_damaged = cur_damaged + (damaged_qty_to_add or 0)
-    new_gift = cur_gift + (gift_to_add or 0)
-    new_total = new_good + new_damaged + new_gift
-    new_note = note_to_add if note_to_add is not None else cur_note
-    c.execute("""
-        UPDATE products
-        SET good_qty=?, damaged_qty=?, total_qty=?, gift=?, note=?
-        WHERE id=?
-    """, (new_good, new_damaged, new_total, new_gift, new_note, prod_id))
-    conn.commit()
-    conn.close()
-    return new_good, new_damaged, new_gift, new_note
+    return row["good_qty"], row["damaged_qty"], row["gift"], row["note"] or ""
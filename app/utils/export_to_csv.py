@@ -1,37 +1,71 @@
-from app.utils.dp_utils import fetch_products
+from app.utils.snapshot import open_snapshot
+from app.utils.task_executor import get_executor
 from tkinter import filedialog, messagebox
 import csv
 
 from app.constants.index import COLUMNS
+
+PROGRESS_EVERY = 5000  # rows between progress reports / cancel checks
+
 # -------------------------
 # Export functions
 # -------------------------
-def export_all_to_csv():
+def export_all_to_csv(on_progress=None):
     file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
     if not file_path:
         return
-    rows = fetch_products()
-    with open(file_path, "w", newline="", encoding="utf-8-sig") as f:
+    # runs in the background; the window stays responsive while the file is written
+    return get_executor().submit(
+        _write_all_csv, file_path,
+        on_done=lambda n: messagebox.showinfo("Success", f"✅ CSV exported to:\n{file_path}"),
+        on_error=lambda e: messagebox.showerror("Error", f"❌ CSV export failed:\n{e}"),
+        on_progress=on_progress,
+    )
+
+def _write_all_csv(task, file_path):
+    # stream from a point-in-time copy so editing can continue while the file is written
+    with open_snapshot() as snap, open(file_path, "w", newline="", encoding="utf-8-sig") as f:
+        total = snap.summary()["product_count"]
         writer = csv.writer(f)
         writer.writerow(COLUMNS)
-        for r in rows:
+        n = 0
+        for n, r in enumerate(snap.iter(), start=1):
             writer.writerow([r[col] for col in COLUMNS])
-    messagebox.showinfo("Success", f"✅ CSV exported to:\n{file_path}")
+            if n % PROGRESS_EVERY == 0:
+                task.check_cancelled()
+                task.report(n, total, "rows written")
+    return n
 
-def export_mismatch_to_csv():
+def export_mismatch_to_csv(on_progress=None):
     file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
     if not file_path:
         return
-    rows = fetch_products()
-    mismatched = [r for r in rows if int(r["required_qty"] or 0) != int(r["total_qty"] or 0)]
+
+    def done(count):
+        if not count:
+            messagebox.showinfo("Success", "ℹ️ No mismatched products found.")
+        else:
+            messagebox.showinfo("Success", f"✅ CSV exported to:\n{file_path}")
+
+    return get_executor().submit(
+        _write_mismatch_csv, file_path,
+        on_done=done,
+        on_error=lambda e: messagebox.showerror("Error", f"❌ CSV export failed:\n{e}"),
+        on_progress=on_progress,
+    )
+
+def _write_mismatch_csv(task, file_path):
+    with open_snapshot() as snap:
+        mismatched = list(snap.iter_mismatched())
     if not mismatched:
-        messagebox.showinfo("Success", "ℹ️ No mismatched products found.")
-        return
+        return 0
     with open(file_path, "w", newline="", encoding="utf-8-sig") as f:
         writer = csv.writer(f)
         writer.writerow(COLUMNS + ["variance"])
-        for r in mismatched:
+        for n, r in enumerate(mismatched, start=1):
             variance = int(r["total_qty"] or 0) - int(r["required_qty"] or 0)
             writer.writerow([r[col] for col in COLUMNS] + [variance])
-    messagebox.showinfo("Success", f"✅ CSV exported to:\n{file_path}")
-
+            if n % PROGRESS_EVERY == 0:
+                task.check_cancelled()
+                task.report(n, len(mismatched), "rows written")
+    return len(mismatched)
@@ -0,0 +1,250 @@
+# migrations.py
+import sqlite3
+
+from app.utils.db_manager import get_db
+
+# -------------------------
+# Shared schema pieces
+# -------------------------
+SUMMARY_FIELDS = {
+    # summary column → products column
+    "total_required": "required_qty",
+    "total_good": "good_qty",
+    "total_damaged": "damaged_qty",
+    "total_gift": "gift",
+    "total_stock": "total_qty",
+}
+
+def qty_sql(ref, col):
+    # same rule as safe_int(): NULL / '' / junk → 0, decimals truncated
+    name = f"{ref}.{col}" if ref else col
+    return f"CAST(IFNULL({name}, 0) AS INTEGER)"
+
+# Fields a CSV catalogue sync writes (quantities are never touched by a sync)
+CATALOG_FIELDS = ("name", "description", "cost", "retail", "required_qty")
+
+# Mismatch filter. Queries must use this exact expression so SQLite can use the partial index.
+MISMATCH_WHERE = f"{qty_sql(None, 'required_qty')} != {qty_sql(None, 'total_qty')}"
+
+
+# -------------------------
+# Migration steps
+# -------------------------
+def _create_products(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            code TEXT UNIQUE,
+            description TEXT,
+            cost REAL,
+            retail REAL,
+            required_qty INTEGER,
+            good_qty INTEGER,
+            damaged_qty INTEGER,
+            total_qty INTEGER,
+            gift INTEGER,
+            note TEXT
+        )
+    """)
+
+
+def _create_fts(conn):
+    """
+    Create the products_fts index (external content → no duplicated text) and the
+    triggers that keep it in sync with products. Skipped when sqlite has no FTS5.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='products_fts'"
+    ).fetchone()
+    if not exists:
+        try:
+            conn.execute("""
+                CREATE VIRTUAL TABLE products_fts USING fts5(
+                    name, description, code,
+                    content='products', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3 4'
+                )
+            """)
+        except sqlite3.OperationalError:
+            # sqlite built without FTS5 → LIKE search only
+            return
+        # index rows that already exist
+        conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, description, code)
+            VALUES (new.id, new.name, new.description, new.code);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description, code)
+            VALUES ('delete', old.id, old.name, old.description, old.code);
+        END
+    """)
+    # only re-index when a searchable column actually changes (quantity edits skip the FTS work)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, code ON products
+        WHEN old.name IS NOT new.name OR old.description IS NOT new.description OR old.code IS NOT new.code
+        BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description, code)
+            VALUES ('delete', old.id, old.name, old.description, old.code);
+            INSERT INTO products_fts(rowid, name, description, code)
+            VALUES (new.id, new.name, new.description, new.code);
+        END
+    """)
+
+
+def _create_summary(conn):
+    """
+    One-row inventory_summary table kept current by triggers on products,
+    so the stats boxes and reports read the totals in O(1).
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='inventory_summary'"
+    ).fetchone()
+    if not exists:
+        conn.execute(f"""
+            CREATE TABLE inventory_summary (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                product_count INTEGER NOT NULL DEFAULT 0,
+                {", ".join(f"{s} INTEGER NOT NULL DEFAULT 0" for s in SUMMARY_FIELDS)}
+            )
+        """)
+        # seed from the rows that already exist
+        conn.execute(f"""
+            INSERT INTO inventory_summary (id, product_count, {", ".join(SUMMARY_FIELDS)})
+            SELECT 1, COUNT(*), {", ".join(f"IFNULL(SUM({qty_sql('p', c)}), 0)" for c in SUMMARY_FIELDS.values())}
+            FROM products p
+        """)
+
+    add_new = ", ".join(f"{s} = {s} + {qty_sql('new', c)}" for s, c in SUMMARY_FIELDS.items())
+    sub_old = ", ".join(f"{s} = {s} - {qty_sql('old', c)}" for s, c in SUMMARY_FIELDS.items())
+    diff = ", ".join(f"{s} = {s} + {qty_sql('new', c)} - {qty_sql('old', c)}" for s, c in SUMMARY_FIELDS.items())
+    qty_cols = ", ".join(SUMMARY_FIELDS.values())
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS products_summary_ai AFTER INSERT ON products BEGIN
+            UPDATE inventory_summary SET product_count = product_count + 1, {add_new} WHERE id = 1;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS products_summary_ad AFTER DELETE ON products BEGIN
+            UPDATE inventory_summary SET product_count = product_count - 1, {sub_old} WHERE id = 1;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS products_summary_au AFTER UPDATE OF {qty_cols} ON products BEGIN
+            UPDATE inventory_summary SET {diff} WHERE id = 1;
+        END
+    """)
+
+
+def _create_performance_indexes(conn):
+    # Mismatch reports: partial index holds only rows where required != total,
+    # and covers the quantity columns the reports print.
+    conn.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_products_mismatch
+        ON products(id, code, required_qty, good_qty, damaged_qty, gift, total_qty)
+        WHERE {MISMATCH_WHERE}
+    """)
+    # Sort keys for fetch_products_page(order_by=...); the rowid rides along, so (col, id) keysets use them.
+    for col in ("name", "description", "required_qty", "total_qty"):
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_products_{col} ON products({col})")
+    # Covering index for the grid sorted by code: code/description/quantities without touching the table.
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_products_grid_code
+        ON products(code, description, required_qty, good_qty, damaged_qty, gift, total_qty)
+    """)
+    conn.execute("ANALYZE")
+
+
+def _add_catalog_hash(conn):
+    """
+    products.catalog_hash: hash of the CSV catalogue fields as last written by a sync, so the
+    next sync can skip rows that didn't change. Any other change to those fields (edit window,
+    add stock, ...) clears it, and the row then counts as changed.
+    """
+    cols = {row[1] for row in conn.execute("PRAGMA table_info(products)")}
+    if "catalog_hash" not in cols:
+        conn.execute("ALTER TABLE products ADD COLUMN catalog_hash TEXT")
+    changed = " OR ".join(f"old.{c} IS NOT new.{c}" for c in CATALOG_FIELDS)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS products_catalog_hash_au AFTER UPDATE OF {", ".join(CATALOG_FIELDS)} ON products
+        WHEN new.catalog_hash IS old.catalog_hash AND ({changed})
+        BEGIN
+            UPDATE products SET catalog_hash = NULL WHERE id = new.id;
+        END
+    """)
+
+
+def _create_import_journal(conn):
+    """
+    Checkpoints of CSV imports, so one interrupted by a crash or a closed app can resume:
+    one row per import (file fingerprint, byte offset after the last committed chunk, rows done,
+    counters so far), plus the codes it applied, needed by a full sync's final deletion phase.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS import_journal (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            byte_offset INTEGER NOT NULL DEFAULT 0,
+            line INTEGER NOT NULL DEFAULT 0,
+            inserted INTEGER NOT NULL DEFAULT 0,
+            updated INTEGER NOT NULL DEFAULT 0,
+            unchanged INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'running',  -- running / done / abandoned
+            started_at TEXT NOT NULL DEFAULT (datetime('now')),
+            updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS import_seen_codes (code TEXT PRIMARY KEY) WITHOUT ROWID")
+
+
+# (version, description, step). Append only. Never edit or renumber a shipped step.
+MIGRATIONS = [
+    (1, "products table", _create_products),
+    (2, "FTS5 search index", _create_fts),
+    (3, "inventory summary", _create_summary),
+    (4, "performance indexes", _create_performance_indexes),
+    (5, "catalog hash for CSV change detection", _add_catalog_hash),
+    (6, "import journal for resumable CSV syncs", _create_import_journal),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# -------------------------
+# Runner
+# -------------------------
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db=None):
+    """
+    Apply every migration newer than PRAGMA user_version. The pending steps and the
+    version bumps run in one transaction, so a failed step leaves the schema untouched.
+    On a warm start this is one PRAGMA read.
+    Returns the schema version after migrating.
+    """
+    db = db or get_db()
+    with db.reader() as conn:
+        if schema_version(conn) >= LATEST_VERSION:
+            return LATEST_VERSION
+
+    with db.transaction() as conn:
+        version = schema_version(conn)  # re-read under the write lock
+        for step_version, description, step in MIGRATIONS:
+            if step_version <= version:
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {step_version}")
+            print(f"🛠️ DB migrated to v{step_version}: {description}")
+            version = step_version
+    return version
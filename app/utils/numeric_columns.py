@@ -0,0 +1,101 @@
+# numeric_columns.py
+import importlib.util
+
+from app.utils.migrations import SUMMARY_FIELDS
+from app.utils.product_repository import NUMERIC_FIELDS
+
+# optional: without NumPy callers fall back to the SQL totals. It's imported by the first
+# NumericColumns (built off the Tk thread, see ProductStore.warm_columns), not at startup.
+np = None
+
+
+def available():
+    """NumPy is installed (checked without importing it)."""
+    return np is not None or importlib.util.find_spec("numpy") is not None
+
+
+def _import_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+class NumericColumns:
+    """
+    Columnar copy of the numeric product fields: one NumPy array per field
+    (required_qty, good_qty, damaged_qty, gift, total_qty → int64; cost, retail → float64),
+    aligned with a sorted `ids` array.
+
+    totals() is one vectorized pass over the whole catalogue or a subset of ids
+    (e.g. a search result), see ProductStore.totals.
+    patch(rows, product_ids) applies committed writes (see ProductStore.refresh).
+    """
+
+    def __init__(self, rows):
+        _import_numpy()
+        data = np.array(rows, dtype=np.float64).reshape(-1, 1 + len(NUMERIC_FIELDS))
+        self.ids = data[:, 0].astype(np.int64)
+        self.cols = {}
+        for i, field in enumerate(NUMERIC_FIELDS, start=1):
+            self.cols[field] = data[:, i].astype(np.float64 if field in ("cost", "retail") else np.int64)
+
+    @classmethod
+    def load(cls, repo):
+        """Build from the DB (one query); repo may be a live or a snapshot repository."""
+        return cls(repo.numeric_rows())
+
+    def __len__(self):
+        return len(self.ids)
+
+    # -------------------------
+    # Selection
+    # -------------------------
+    def _positions(self, product_ids):
+        """Array positions of product_ids that exist (unknown ids are left out)."""
+        wanted = np.asarray(product_ids, dtype=np.int64)
+        pos = np.searchsorted(self.ids, wanted)
+        pos[pos == len(self.ids)] = 0
+        return pos[self.ids[pos] == wanted] if len(self.ids) else pos[:0]
+
+    # -------------------------
+    # Vectorized stats
+    # -------------------------
+    def totals(self, product_ids=None):
+        """Same keys as ProductRepository.summary()/totals(): product_count, total_required, ..."""
+        pos = None if product_ids is None else self._positions(product_ids)
+        result = {"product_count": len(self.ids) if pos is None else len(pos)}
+        for key, field in SUMMARY_FIELDS.items():
+            col = self.cols[field]
+            result[key] = int((col if pos is None else col[pos]).sum())
+        return result
+
+    # -------------------------
+    # Keeping in step with writes
+    # -------------------------
+    def patch(self, rows, product_ids):
+        """
+        Apply re-read rows ((id, *NUMERIC_FIELDS) tuples from repo.numeric_rows(product_ids)):
+        ids with a row are updated/inserted, ids without one were deleted.
+        """
+        fresh = NumericColumns(rows)
+        gone = np.setdiff1d(np.asarray(sorted({int(p) for p in product_ids}), dtype=np.int64), fresh.ids)
+
+        # updates in place
+        pos = np.searchsorted(self.ids, fresh.ids)
+        inside = pos < len(self.ids)
+        known = np.zeros(len(fresh.ids), dtype=bool)
+        known[inside] = self.ids[pos[inside]] == fresh.ids[inside]
+        for field, col in self.cols.items():
+            col[pos[known]] = fresh.cols[field][known]
+
+        # deletes, then inserts (new ids are usually appended at the end)
+        drop = self._positions(gone) if len(gone) else None
+        new = ~known
+        if drop is not None and len(drop):
+            self.ids = np.delete(self.ids, drop)
+            self.cols = {f: np.delete(c, drop) for f, c in self.cols.items()}
+        if new.any():
+            at = np.searchsorted(self.ids, fresh.ids[new])
+            self.ids = np.insert(self.ids, at, fresh.ids[new])
+            self.cols = {f: np.insert(c, at, fresh.cols[f][new]) for f, c in self.cols.items()}
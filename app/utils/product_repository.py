@@ -0,0 +1,619 @@
+# product_repository.py
+import hashlib
+import re
+import sqlite3
+import threading
+
+from app.constants.index import COLUMNS
+from app.utils.db_manager import get_db
+from app.utils.migrations import SUMMARY_FIELDS, MISMATCH_WHERE, qty_sql
+
+# -------------------------
+# SQL text
+# Statements are module constants so every call reuses the same string and
+# therefore the same compiled statement from the connection's statement cache.
+# -------------------------
+PRODUCT_FIELDS = [c for c in COLUMNS if c != "id"]
+QTY_FIELDS = ("good_qty", "damaged_qty", "gift")
+SUMMARY_KEYS = ("product_count", *SUMMARY_FIELDS)
+
+SORT_COLUMNS = {
+    "id", "name", "code", "description", "cost", "retail",
+    "required_qty", "good_qty", "damaged_qty", "gift", "total_qty",
+}
+SEARCH_MODES = ("prefix", "token", "like")
+_MISSING = object()
+
+SQL_BY_ID = "SELECT * FROM products WHERE id = ?"
+SQL_BY_CODE = "SELECT * FROM products WHERE code = ?"
+SQL_CODES = "SELECT code FROM products"
+SQL_SUMMARY = "SELECT * FROM inventory_summary WHERE id = 1"
+SQL_MISMATCHED = f"SELECT * FROM products WHERE {MISMATCH_WHERE} ORDER BY id"
+# numeric fields as plain numbers, with the same NULL/junk → 0 rule as the SUM()s
+PRICE_FIELDS = ("cost", "retail")
+NUMERIC_FIELDS = (*SUMMARY_FIELDS.values(), *PRICE_FIELDS)
+SQL_NUMERIC = (
+    "SELECT id, "
+    + ", ".join([qty_sql(None, c) for c in SUMMARY_FIELDS.values()]
+                + [f"CAST(IFNULL({c}, 0) AS REAL)" for c in PRICE_FIELDS])
+    + " FROM products"
+)
+SQL_INSERT = (
+    f"INSERT INTO products ({', '.join(PRODUCT_FIELDS)}) "
+    f"VALUES ({', '.join(':' + f for f in PRODUCT_FIELDS)})"
+)
+SQL_UPDATE = (
+    f"UPDATE products SET {', '.join(f'{f} = :{f}' for f in PRODUCT_FIELDS)} WHERE id = :id"
+)
+SQL_DELETE = "DELETE FROM products WHERE id = ?"
+SQL_DELETE_BY_CODE = "DELETE FROM products WHERE code = ?"
+SQL_INCREMENT = """
+    UPDATE products SET
+        good_qty = {good} + :good_qty,
+        damaged_qty = {damaged} + :damaged_qty,
+        gift = {gift} + :gift,
+        total_qty = {good} + {damaged} + {gift} + :good_qty + :damaged_qty + :gift,
+        note = COALESCE(:note, note),
+        description = COALESCE(:description, description)
+    WHERE {{key}} = :key
+    RETURNING id, code, good_qty, damaged_qty, gift, total_qty, note
+""".format(good=qty_sql(None, "good_qty"), damaged=qty_sql(None, "damaged_qty"), gift=qty_sql(None, "gift"))
+SQL_INCREMENT_BY = {key: SQL_INCREMENT.format(key=key) for key in ("id", "code")}
+# CSV catalogue fields only; quantities are never touched by a catalogue sync.
+# catalog_hash (see catalog_hash()) is written along with them so the next sync can skip unchanged rows.
+SQL_CATALOG_HASH_BY_CODE = "SELECT catalog_hash FROM products WHERE code = ?"
+SQL_UPDATE_CATALOG = """
+    UPDATE products SET name = ?, description = ?, cost = ?, retail = ?, required_qty = ?, catalog_hash = ?
+    WHERE code = ?
+"""
+SQL_INSERT_CATALOG = """
+    INSERT INTO products (code, name, description, cost, retail, required_qty, catalog_hash, good_qty, gift, damaged_qty, total_qty)
+    VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0, 0, 0)
+"""
+# Set-based catalogue upsert: rows are staged in a temp table, then applied in two statements.
+# Existing codes are updated with UPDATE ... FROM first (a conflicting INSERT would burn an
+# AUTOINCREMENT id per updated row), skipping those whose catalog_hash is unchanged; the
+# INSERT's ON CONFLICT then only resolves codes that appear more than once among the new ones.
+# The last line of a code wins, as row by row.
+# "WHERE ... ORDER BY" before ON CONFLICT keeps SQLite from parsing it as a join constraint.
+SQL_CREATE_CATALOG_IMPORT = """
+    CREATE TEMP TABLE IF NOT EXISTS catalog_import (
+        line INTEGER PRIMARY KEY, code TEXT, name TEXT, description TEXT,
+        cost REAL, retail REAL, required_qty INTEGER, hash TEXT
+    )
+"""
+SQL_STAGE_CATALOG = "INSERT INTO temp.catalog_import VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_STAGED_EXISTING = (
+    "SELECT DISTINCT i.code, p.catalog_hash FROM temp.catalog_import i JOIN products p ON p.code = i.code"
+)
+SQL_UPDATE_STAGED_CATALOG = """
+    UPDATE products SET
+        name = i.name, description = i.description, cost = i.cost,
+        retail = i.retail, required_qty = i.required_qty, catalog_hash = i.hash
+    FROM (
+        -- bare columns next to MAX() come from the row with the highest line
+        SELECT MAX(line), code, name, description, cost, retail, required_qty, hash
+        FROM temp.catalog_import GROUP BY code
+    ) AS i
+    WHERE products.code = i.code AND products.catalog_hash IS NOT i.hash
+"""
+SQL_INSERT_STAGED_CATALOG = """
+    INSERT INTO products (code, name, description, cost, retail, required_qty, catalog_hash, good_qty, gift, damaged_qty, total_qty)
+    SELECT code, name, description, cost, retail, required_qty, hash, 0, 0, 0, 0
+    FROM temp.catalog_import i
+    WHERE NOT EXISTS (SELECT 1 FROM products p WHERE p.code = i.code) ORDER BY line
+    ON CONFLICT(code) DO UPDATE SET
+        name = excluded.name, description = excluded.description, cost = excluded.cost,
+        retail = excluded.retail, required_qty = excluded.required_qty, catalog_hash = excluded.catalog_hash
+"""
+SQL_CLEAR_CATALOG_IMPORT = "DELETE FROM temp.catalog_import"
+# A dry run remembers the hash it planned per code: a code seen again in a later chunk is then
+# compared with the planned row, as the real sync compares it with the row it has just written.
+SQL_CREATE_CATALOG_PLAN = "CREATE TEMP TABLE IF NOT EXISTS catalog_plan (code TEXT PRIMARY KEY, hash TEXT) WITHOUT ROWID"
+SQL_PLANNED_EXISTING = """
+    SELECT DISTINCT i.code, COALESCE(pl.code, p.code) IS NOT NULL, IIF(pl.code IS NULL, p.catalog_hash, pl.hash)
+    FROM temp.catalog_import i
+    LEFT JOIN temp.catalog_plan pl ON pl.code = i.code
+    LEFT JOIN products p ON p.code = i.code
+"""
+SQL_PLANNED_HASH_BY_CODE = """
+    SELECT hash FROM temp.catalog_plan WHERE code = :code
+    UNION ALL
+    SELECT catalog_hash FROM products WHERE code = :code AND NOT EXISTS (SELECT 1 FROM temp.catalog_plan WHERE code = :code)
+"""
+SQL_PLAN_CATALOG = "INSERT OR REPLACE INTO temp.catalog_plan VALUES (?, ?)"
+SQL_CLEAR_CATALOG_PLAN = "DELETE FROM temp.catalog_plan"
+# Codes seen by a streamed CSV sync, so the deletion phase doesn't need them in memory
+SQL_CREATE_SEEN_CODES = "CREATE TEMP TABLE IF NOT EXISTS seen_codes (code TEXT PRIMARY KEY) WITHOUT ROWID"
+SQL_TRACK_CODE = "INSERT OR IGNORE INTO temp.seen_codes VALUES (?)"
+# same rule as delete_if_empty(): stock > 0 protects a product, 0 / NULL / negative doesn't
+SQL_UNTRACKED_WHERE = "code IS NOT NULL AND code NOT IN (SELECT code FROM temp.seen_codes)"
+SQL_UNTRACKED_WITH_STOCK = f"SELECT code, total_qty FROM products WHERE {SQL_UNTRACKED_WHERE} AND total_qty > 0 ORDER BY code"
+SQL_UNTRACKED_EMPTY = f"SELECT code FROM products WHERE {SQL_UNTRACKED_WHERE} AND IFNULL(total_qty, 0) <= 0 ORDER BY code"
+SQL_DELETE_UNTRACKED_EMPTY = f"DELETE FROM products WHERE {SQL_UNTRACKED_WHERE} AND IFNULL(total_qty, 0) <= 0"
+SQL_CLEAR_SEEN_CODES = "DELETE FROM temp.seen_codes"
+# ... and by a journaled (resumable) sync, in a real table so they survive a restart
+SQL_TRACK_CODE_DURABLE = "INSERT OR IGNORE INTO import_seen_codes VALUES (?)"
+SQL_RESTORE_SEEN_CODES = "INSERT OR IGNORE INTO temp.seen_codes SELECT code FROM import_seen_codes"
+SQL_CLEAR_DURABLE_CODES = "DELETE FROM import_seen_codes"
+# Import journal (one checkpoint row per sync, see migrations._create_import_journal)
+SQL_PENDING_IMPORT = "SELECT * FROM import_journal WHERE status = 'running' ORDER BY id DESC LIMIT 1"
+SQL_START_IMPORT = "INSERT INTO import_journal (path, fingerprint, mode) VALUES (?, ?, ?)"
+SQL_CHECKPOINT_IMPORT = """
+    UPDATE import_journal SET byte_offset = ?, line = ?, inserted = ?, updated = ?, unchanged = ?, errors = ?,
+        updated_at = datetime('now')
+    WHERE id = ?
+"""
+SQL_FINISH_IMPORT = "UPDATE import_journal SET status = ?, updated_at = datetime('now') WHERE id = ?"
+SQL_ABANDON_IMPORTS = "UPDATE import_journal SET status = 'abandoned', updated_at = datetime('now') WHERE status = 'running'"
+JOURNAL_COUNTERS = ("inserted", "updated", "unchanged", "errors")
+
+
+# unicode61 tokens are runs of letters/digits: a term without any (e.g. "-", '"') holds no token
+_FTS_TOKEN_CHAR = re.compile(r"[^\W_]")
+
+
+def _fts_query(search_text, mode):
+    """
+    Build an FTS5 MATCH expression from free text.
+    mode "prefix": every term matches as a token prefix ("sam gal" → Samsung Galaxy)
+    mode "token":  every term must match a whole token
+    Terms with no token in them are left out (they'd match nothing); "" when none is left.
+    """
+    terms = []
+    for term in search_text.split():
+        if not _FTS_TOKEN_CHAR.search(term):
+            continue
+        term = term.replace('"', '""')
+        terms.append(f'"{term}"*' if mode == "prefix" else f'"{term}"')
+    return " AND ".join(terms)
+
+
+def catalog_hash(name, description, cost, retail, required_qty):
+    """Hash of the fields a CSV sync writes, as parsed from the CSV (stored in products.catalog_hash)."""
+    return hashlib.blake2b(repr((name, description, cost, retail, required_qty)).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _chunks(cur, chunk_size):
+    try:
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield from chunk
+    finally:
+        cur.close()
+
+
+class ProductRepository:
+    """
+    The one place that talks SQL to the products table.
+
+    Reads borrow a pooled reader connection, writes run in a writer transaction
+    (nested calls become SAVEPOINTs, so methods compose inside a bigger transaction).
+    Rows come back as sqlite3.Row.
+    """
+
+    def __init__(self, db=None):
+        self.db = db or get_db()
+        self._fts = None
+
+    # -------------------------
+    # Search
+    # -------------------------
+    def fts_available(self):
+        if self._fts is None:
+            with self.db.reader() as conn:
+                self._fts = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='products_fts'"
+                ).fetchone() is not None
+        return self._fts
+
+    def reset_schema_cache(self):
+        """Forget cached schema facts (call after migrations)."""
+        self._fts = None
+
+    def _search_where(self, search_text, mode):
+        """Return (where_sql, params) filtering products by search_text in the given mode."""
+        search_text = (search_text or "").strip()
+        if not search_text:
+            return "1", ()
+        fts = _fts_query(search_text, mode) if mode != "like" and self.fts_available() else ""
+        if fts:
+            return "id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)", (fts,)
+        # LIKE: asked for, no FTS table, or nothing FTS5 can tokenize (e.g. only punctuation)
+        q = f"%{search_text}%"
+        return "(name LIKE ? OR description LIKE ? OR code LIKE ?)", (q, q, q)
+
+    def _execute_search(self, conn, sql, search_text, mode, params=()):
+        """
+        Execute sql (containing a {where} placeholder) filtered by the search.
+        A MATCH expression FTS5 rejects (fts5: syntax error ...) is retried as a LIKE search.
+        """
+        where, search_params = self._search_where(search_text, mode)
+        try:
+            return conn.execute(sql.format(where=where), search_params + tuple(params))
+        except sqlite3.OperationalError:
+            if mode == "like" or "MATCH" not in where:
+                raise
+            where, search_params = self._search_where(search_text, "like")
+            return conn.execute(sql.format(where=where), search_params + tuple(params))
+
+    # -------------------------
+    # Reads
+    # -------------------------
+    def fetch(self, search_text="", mode="prefix"):
+        """All matching products ordered by id (list of rows)."""
+        with self.db.reader() as conn:
+            return self._execute_search(
+                conn, "SELECT * FROM products WHERE {where} ORDER BY id ASC", search_text, mode
+            ).fetchall()
+
+    def page(self, search="", after_id=None, limit=200, order_by="id", mode="prefix", after_key=_MISSING):
+        """
+        Keyset pagination: up to `limit` rows sorted by (order_by, id) that come after
+        the row `after_id` (None → first page). Cost is O(limit) at any depth.
+        For order_by other than "id" the sort value of after_id is looked up unless
+        given as after_key (needed if that row may have been deleted in the meantime).
+        """
+        if order_by not in SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort column: {order_by}")
+
+        with self.db.reader() as conn:
+            keyset, params = "1", ()
+            if after_id is not None:
+                if order_by == "id":
+                    keyset, params = "id > ?", (after_id,)
+                else:
+                    if after_key is _MISSING:
+                        row = conn.execute(f"SELECT {order_by} FROM products WHERE id = ?", (after_id,)).fetchone()
+                        after_key = row[0] if row else None
+                    if after_key is None:
+                        # NULLs sort first → everything non-NULL, or NULL rows with a bigger id
+                        keyset, params = f"({order_by} IS NOT NULL OR id > ?)", (after_id,)
+                    else:
+                        keyset, params = f"({order_by}, id) > (?, ?)", (after_key, after_id)
+
+            order = "id" if order_by == "id" else f"{order_by}, id"
+            sql = f"SELECT * FROM products WHERE {{where}} AND {keyset} ORDER BY {order} LIMIT ?"
+            return self._execute_search(conn, sql, search, mode, params + (limit,)).fetchall()
+
+    def ids(self, search="", mode="prefix"):
+        """Ids of every matching product in id order (index-only scan; rows are fetched later by page())."""
+        with self.db.reader() as conn:
+            cur = self._execute_search(conn, "SELECT id FROM products WHERE {where} ORDER BY id", search, mode)
+            return [row[0] for row in cur]
+
+    def iter(self, search="", order_by="id", chunk_size=1000, mode="prefix"):
+        """Stream matching rows from one cursor, chunk_size rows at a time."""
+        if order_by not in SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort column: {order_by}")
+        order = "id" if order_by == "id" else f"{order_by}, id"
+        with self.db.reader() as conn:
+            cur = self._execute_search(conn, f"SELECT * FROM products WHERE {{where}} ORDER BY {order}", search, mode)
+            yield from _chunks(cur, chunk_size)
+
+    def iter_mismatched(self, chunk_size=1000):
+        """Stream products whose required_qty != total_qty (idx_products_mismatch partial index)."""
+        with self.db.reader() as conn:
+            yield from _chunks(conn.execute(SQL_MISMATCHED), chunk_size)
+
+    def numeric_rows(self, product_ids=None):
+        """(id, *NUMERIC_FIELDS) tuples in id order, for every product or only product_ids."""
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.row_factory = None  # plain tuples: they go straight into NumPy arrays
+            if product_ids is None:
+                return cur.execute(SQL_NUMERIC + " ORDER BY id").fetchall()
+            product_ids = sorted({int(pid) for pid in product_ids})
+            rows = []
+            for i in range(0, len(product_ids), 500):  # stay under SQLite's host-parameter limit
+                chunk = product_ids[i:i + 500]
+                sql = f"{SQL_NUMERIC} WHERE id IN ({', '.join('?' * len(chunk))}) ORDER BY id"
+                rows.extend(cur.execute(sql, chunk).fetchall())
+            return rows
+
+    def get_by_id(self, product_id):
+        with self.db.reader() as conn:
+            return conn.execute(SQL_BY_ID, (product_id,)).fetchone()
+
+    def fetch_by_ids(self, product_ids, search="", mode="prefix"):
+        """Rows among product_ids that exist and match the search (id order). Missing ids are left out."""
+        product_ids = sorted({int(pid) for pid in product_ids})
+        rows = []
+        with self.db.reader() as conn:
+            for i in range(0, len(product_ids), 500):  # stay under SQLite's host-parameter limit
+                chunk = product_ids[i:i + 500]
+                sql = f"SELECT * FROM products WHERE {{where}} AND id IN ({', '.join('?' * len(chunk))}) ORDER BY id"
+                rows.extend(self._execute_search(conn, sql, search, mode, chunk).fetchall())
+        return rows
+
+    def get_by_code(self, code):
+        with self.db.reader() as conn:
+            return conn.execute(SQL_BY_CODE, (code,)).fetchone()
+
+    def codes(self):
+        """Set of every product code."""
+        with self.db.reader() as conn:
+            return {row[0] for row in conn.execute(SQL_CODES)}
+
+    def summary(self):
+        """Trigger-maintained totals: dict with product_count, total_required, total_good, ..."""
+        with self.db.reader() as conn:
+            row = conn.execute(SQL_SUMMARY).fetchone()
+        if row is None:
+            return dict.fromkeys(SUMMARY_KEYS, 0)
+        return {k: row[k] for k in SUMMARY_KEYS}
+
+    def totals(self, search_text="", mode="prefix"):
+        """summary() when there's no search, otherwise one SUM() over the matching rows."""
+        if not (search_text or "").strip():
+            return self.summary()
+        cols = ", ".join(f"IFNULL(SUM({qty_sql(None, c)}), 0) AS {s}" for s, c in SUMMARY_FIELDS.items())
+        with self.db.reader() as conn:
+            row = self._execute_search(
+                conn, f"SELECT COUNT(*) AS product_count, {cols} FROM products WHERE {{where}}", search_text, mode
+            ).fetchone()
+        return {k: row[k] for k in SUMMARY_KEYS}
+
+    # -------------------------
+    # Writes
+    # -------------------------
+    def insert(self, data):
+        """Insert one product from a dict of PRODUCT_FIELDS (missing → NULL). Returns the new id."""
+        params = {f: data.get(f) for f in PRODUCT_FIELDS}
+        with self.db.transaction() as conn:
+            return conn.execute(SQL_INSERT, params).lastrowid
+
+    def bulk_insert(self, rows):
+        """Insert many product dicts in one transaction. Returns the number inserted."""
+        params = [{f: r.get(f) for f in PRODUCT_FIELDS} for r in rows]
+        with self.db.transaction() as conn:
+            conn.executemany(SQL_INSERT, params)
+        return len(params)
+
+    def update(self, data):
+        """Overwrite every field of product data["id"]. Returns True if a row was updated."""
+        params = {f: data.get(f) for f in PRODUCT_FIELDS}
+        params["id"] = data["id"]
+        with self.db.transaction() as conn:
+            return conn.execute(SQL_UPDATE, params).rowcount > 0
+
+    def update_fields(self, product_id, changes):
+        """
+        Update only the given {field: value} pairs. When a quantity changes, total_qty is
+        recomputed in SQL from the new values, so other columns edited concurrently are kept.
+        """
+        unknown = set(changes) - set(PRODUCT_FIELDS)
+        if unknown or "total_qty" in changes:
+            raise ValueError(f"Not writable: {', '.join(sorted(unknown | ({'total_qty'} & set(changes))))}")
+        fields = sorted(changes)
+        sets = [f"{f} = ?" for f in fields]
+        params = [changes[f] for f in fields]
+        if any(f in QTY_FIELDS for f in fields):
+            # SET expressions see the OLD row → use the new value for changed quantities
+            terms = []
+            for f in QTY_FIELDS:
+                if f in changes:
+                    terms.append("?")
+                    params.append(int(changes[f] or 0))
+                else:
+                    terms.append(qty_sql(None, f))
+            sets.append("total_qty = " + " + ".join(terms))
+        with self.db.transaction() as conn:
+            return conn.execute(f"UPDATE products SET {', '.join(sets)} WHERE id = ?", params + [product_id]).rowcount > 0
+
+    def increment(self, key, deltas, by="id"):
+        """Atomically add deltas to one product. Returns the updated row or None."""
+        return self.increment_batch([(key, deltas)], by=by)[0]
+
+    def increment_batch(self, items, by="code"):
+        """
+        items: iterable of (key, deltas); deltas is a dict with any of good_qty, damaged_qty,
+        gift (added) and note, description (overwritten when not None).
+        One transaction, one UPDATE ... RETURNING per item. Returns a row or None per item.
+        """
+        if by not in SQL_INCREMENT_BY:
+            raise ValueError(f"Unsupported key column: {by}")
+        sql = SQL_INCREMENT_BY[by]
+        results = []
+        with self.db.transaction() as conn:
+            for key, deltas in items:
+                params = {
+                    "key": key,
+                    "good_qty": int(deltas.get("good_qty") or 0),
+                    "damaged_qty": int(deltas.get("damaged_qty") or 0),
+                    "gift": int(deltas.get("gift") or 0),
+                    "note": deltas.get("note"),
+                    "description": deltas.get("description"),
+                }
+                # fetchall() steps the statement to completion before the next one / COMMIT
+                rows = conn.execute(sql, params).fetchall()
+                results.append(rows[0] if rows else None)
+        return results
+
+    def delete(self, product_id):
+        with self.db.transaction() as conn:
+            return conn.execute(SQL_DELETE, (product_id,)).rowcount > 0
+
+    def delete_many(self, product_ids):
+        """Delete several products by id in one transaction. Returns the number deleted."""
+        with self.db.transaction() as conn:
+            cur = conn.executemany(SQL_DELETE, [(pid,) for pid in product_ids])
+            return cur.rowcount
+
+    def delete_by_code(self, code):
+        with self.db.transaction() as conn:
+            return conn.execute(SQL_DELETE_BY_CODE, (code,)).rowcount > 0
+
+    def delete_if_empty(self, code):
+        """
+        Delete `code` only when its total_qty is 0/NULL.
+        Returns (True, 0) when deleted, (False, qty) when stock protects it.
+        """
+        with self.db.transaction() as conn:
+            row = conn.execute(SQL_BY_CODE, (code,)).fetchone()
+            qty = row["total_qty"] if row else 0
+            if qty and qty > 0:
+                return False, qty
+            conn.execute(SQL_DELETE_BY_CODE, (code,))
+            return True, 0
+
+    # -------------------------
+    # CSV catalogue sync
+    # -------------------------
+    def upsert_catalog(self, code, name, description, cost, retail, required_qty, apply=True):
+        """
+        Update the catalogue fields of `code`, or insert it with zero quantities.
+        Returns "updated", "inserted", or "unchanged" when the fields match what the last sync wrote.
+        apply=False only works out the status (dry run), against what the dry run planned so far.
+        """
+        h = catalog_hash(name, description, cost, retail, required_qty)
+        with self.db.transaction() as conn:
+            if apply:
+                row = conn.execute(SQL_CATALOG_HASH_BY_CODE, (code,)).fetchone()
+            else:
+                conn.execute(SQL_CREATE_CATALOG_PLAN)
+                row = conn.execute(SQL_PLANNED_HASH_BY_CODE, {"code": code}).fetchone()
+                conn.execute(SQL_PLAN_CATALOG, (code, h))
+            if row is not None and row[0] == h:
+                return "unchanged"
+            if apply:
+                if row is not None:
+                    conn.execute(SQL_UPDATE_CATALOG, (name, description, cost, retail, required_qty, h, code))
+                else:
+                    conn.execute(SQL_INSERT_CATALOG, (code, name, description, cost, retail, required_qty, h))
+            return "updated" if row is not None else "inserted"
+
+    def upsert_catalog_many(self, rows, apply=True):
+        """
+        Set-based upsert_catalog() for many rows of (line, code, name, description, cost, retail, required_qty):
+        they're staged in a temp table with executemany and applied by one UPDATE ... FROM plus one
+        INSERT ... ON CONFLICT(code) DO UPDATE, touching only the catalogue fields (and catalog_hash).
+        Returns [(line, code, "inserted"/"updated"/"unchanged")] in line order, exactly like calling
+        upsert_catalog() row by row: a repeated code is compared with its previous line, the last line wins.
+        apply=False only works out the statuses (dry run); products isn't written. The planned rows
+        are remembered (temp.catalog_plan, see begin_plan()), so a code repeated in a later call is
+        compared with the row planned for it, as the real sync compares it with the row it wrote.
+        """
+        staged = [(*row, catalog_hash(*row[2:])) for row in rows]
+        with self.db.transaction() as conn:
+            conn.execute(SQL_CREATE_CATALOG_IMPORT)
+            try:
+                conn.executemany(SQL_STAGE_CATALOG, staged)
+                if apply:
+                    current = dict(conn.execute(SQL_STAGED_EXISTING).fetchall())  # code → stored hash
+                else:
+                    conn.execute(SQL_CREATE_CATALOG_PLAN)
+                    current = {code: h for code, known, h in conn.execute(SQL_PLANNED_EXISTING) if known}
+                if apply:
+                    if current:
+                        conn.execute(SQL_UPDATE_STAGED_CATALOG)
+                    if len(current) < len(staged):
+                        conn.execute(SQL_INSERT_STAGED_CATALOG)
+            finally:
+                conn.execute(SQL_CLEAR_CATALOG_IMPORT)
+        results = []
+        for line, code, *_, h in staged:
+            if code not in current:
+                status = "inserted"
+            else:
+                status = "unchanged" if current[code] == h else "updated"
+            results.append((line, code, status))
+            current[code] = h
+        if not apply:
+            with self.db.transaction() as conn:
+                conn.executemany(SQL_PLAN_CATALOG, current.items())
+        return results
+
+    def begin_plan(self):
+        """Start a dry run: forget the rows planned by an earlier one."""
+        with self.db.transaction() as conn:
+            conn.execute(SQL_CREATE_CATALOG_PLAN)
+            conn.execute(SQL_CLEAR_CATALOG_PLAN)
+
+    # Code tracking for a streamed sync (writer connection: call inside db.transaction())
+    def begin_code_tracking(self):
+        with self.db.transaction() as conn:
+            conn.execute(SQL_CREATE_SEEN_CODES)
+            conn.execute(SQL_CLEAR_SEEN_CODES)
+
+    def track_codes(self, codes, durable=False):
+        """durable=True → into import_seen_codes (a journaled sync), see restore_tracked_codes()."""
+        with self.db.transaction() as conn:
+            conn.executemany(SQL_TRACK_CODE_DURABLE if durable else SQL_TRACK_CODE, ((c,) for c in codes))
+
+    def restore_tracked_codes(self):
+        """Start tracking again with the codes a journaled sync tracked durably (its deletion phase)."""
+        with self.db.transaction() as conn:
+            conn.execute(SQL_CREATE_SEEN_CODES)
+            conn.execute(SQL_CLEAR_SEEN_CODES)
+            conn.execute(SQL_RESTORE_SEEN_CODES)
+
+    def delete_untracked_if_empty(self, apply=True):
+        """
+        Set-based delete_if_empty() for every product whose code wasn't tracked since
+        begin_code_tracking(): one DELETE for those without stock, one SELECT for those kept.
+        Returns (deleted codes, [(code, qty) skipped]), both in code order.
+        apply=False only lists them (dry run).
+        """
+        with self.db.transaction() as conn:
+            skipped = [(row[0], row[1]) for row in conn.execute(SQL_UNTRACKED_WITH_STOCK)]
+            deleted = [row[0] for row in conn.execute(SQL_UNTRACKED_EMPTY)]
+            if deleted and apply:
+                conn.execute(SQL_DELETE_UNTRACKED_EMPTY)
+        return deleted, skipped
+
+    def end_code_tracking(self):
+        with self.db.transaction() as conn:
+            conn.execute(SQL_CLEAR_SEEN_CODES)
+
+    # -------------------------
+    # Import journal (resumable CSV syncs)
+    # -------------------------
+    def pending_import(self):
+        """The unfinished (status 'running') import, as a dict, or None."""
+        with self.db.reader() as conn:
+            row = conn.execute(SQL_PENDING_IMPORT).fetchone()
+        return dict(row) if row else None
+
+    def start_import(self, path, fingerprint, mode):
+        """New journal entry; any unfinished one is abandoned. Returns it as pending_import() would."""
+        with self.db.transaction() as conn:
+            conn.execute(SQL_ABANDON_IMPORTS)
+            conn.execute(SQL_CLEAR_DURABLE_CODES)
+            conn.execute(SQL_START_IMPORT, (path, fingerprint, mode))
+            return dict(conn.execute(SQL_PENDING_IMPORT).fetchone())
+
+    def checkpoint_import(self, import_id, byte_offset, line, counts):
+        """Record progress; call in the transaction that applied the chunk, so both commit together."""
+        with self.db.transaction() as conn:
+            conn.execute(SQL_CHECKPOINT_IMPORT,
+                         (byte_offset, line, *(counts.get(k, 0) for k in JOURNAL_COUNTERS), import_id))
+
+    def finish_import(self, import_id, status="done"):
+        with self.db.transaction() as conn:
+            conn.execute(SQL_FINISH_IMPORT, (status, import_id))
+            conn.execute(SQL_CLEAR_DURABLE_CODES)
+
+    def abandon_imports(self):
+        with self.db.transaction() as conn:
+            conn.execute(SQL_ABANDON_IMPORTS)
+            conn.execute(SQL_CLEAR_DURABLE_CODES)
+
+
+# -------------------------
+# Shared instance
+# -------------------------
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository():
+    """Return the process-wide ProductRepository."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = ProductRepository()
+    return _repository
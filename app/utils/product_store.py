@@ -0,0 +1,230 @@
+# product_store.py
+import threading
+
+from app.constants.index import COLUMNS
+from app.utils import numeric_columns
+from app.utils.product_repository import get_repository
+
+FIELD_INDEX = {col: i for i, col in enumerate(COLUMNS)}
+SEARCH_FIELDS = ("name", "description", "code")
+
+# Change events: callback(kind, product_id)
+INSERTED = "inserted"
+UPDATED = "updated"
+DELETED = "deleted"
+SUMMARY = "summary"    # product_id is None
+RELOADED = "reloaded"  # product_id is None; anything may have changed (e.g. after a CSV sync)
+
+
+class ProductStore:
+    """
+    In-memory view of the products table shared by every window.
+
+    The catalogue is loaded once, on first use, into compact records: one tuple per
+    product in COLUMNS order, keyed by id. Writes go through to the DB (ProductRepository),
+    then only the touched rows are re-read and subscribers get fine-grained events,
+    so open views patch themselves instead of re-running full queries.
+
+    Events are published on the thread that made the change (the Tk thread in this app).
+
+    With NumPy installed, warm_columns() also keeps a NumericColumns cache of the numeric
+    fields (built in the background, patched on every refresh) for vectorized totals.
+    """
+
+    def __init__(self, repo=None):
+        self.repo = repo or get_repository()
+        self._records = None   # product id → tuple in COLUMNS order (None until loaded)
+        self._summary = None
+        self._subscribers = []
+        self._columns = None          # NumericColumns once built
+        self._columns_pending = None  # ids written while a background build runs
+        self._executor = None
+
+    # -------------------------
+    # Subscriptions
+    # -------------------------
+    def subscribe(self, callback):
+        """Call callback(kind, product_id) on every change. Returns an unsubscribe function."""
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _publish(self, kind, product_id=None):
+        for callback in list(self._subscribers):
+            try:
+                callback(kind, product_id)
+            except Exception as e:
+                print(f"⚠️ Store subscriber error ({kind}): {e}")
+
+    # -------------------------
+    # Reads (memory)
+    # -------------------------
+    @property
+    def records(self):
+        if self._records is None:
+            self._records = {r["id"]: _record(r) for r in self.repo.iter(chunk_size=5000)}
+        return self._records
+
+    def get(self, product_id):
+        """Product as a dict (or None)."""
+        rec = self.records.get(int(product_id))
+        return dict(zip(COLUMNS, rec)) if rec else None
+
+    def search(self, text=""):
+        """Records whose name/description/code contain every term of text (case-insensitive), in id order."""
+        terms = (text or "").lower().split()
+        if not terms:
+            return list(self.records.values())
+        idx = [FIELD_INDEX[f] for f in SEARCH_FIELDS]
+        found = []
+        for rec in self.records.values():
+            haystack = " ".join(str(rec[i] or "") for i in idx).lower()
+            if all(t in haystack for t in terms):
+                found.append(rec)
+        return found
+
+    def summary(self):
+        if self._summary is None:
+            self._summary = self.repo.summary()
+        return self._summary
+
+    # -------------------------
+    # Columnar cache (NumPy, optional)
+    # -------------------------
+    @property
+    def columns(self):
+        """NumericColumns of the catalogue, or None (NumPy missing / not built yet) → use SQL totals."""
+        return self._columns
+
+    def totals(self, product_ids):
+        """Vectorized totals over product_ids, or None when the columnar cache isn't available."""
+        return self._columns.totals(product_ids) if self._columns is not None else None
+
+    def warm_columns(self, executor):
+        """Build the columnar cache on the executor; the Tk thread stays free. No-op without NumPy."""
+        self._executor = executor
+        if not numeric_columns.available() or self._columns is not None or self._columns_pending is not None:
+            return
+        pending = self._columns_pending = set()
+
+        def adopt(columns):
+            if pending is not self._columns_pending:
+                return  # reloaded meanwhile; a newer build is on its way
+            self._columns_pending = None
+            if pending:
+                # written while the build was reading → re-read them now
+                columns.patch(self.repo.numeric_rows(pending), pending)
+            self._columns = columns
+
+        def failed(e):
+            if pending is self._columns_pending:
+                self._columns_pending = None
+            print(f"⚠️ Numeric cache not built: {e}")
+
+        executor.submit(lambda task: numeric_columns.NumericColumns.load(self.repo),
+                        on_done=adopt, on_error=failed, name="numeric_columns")
+
+    # -------------------------
+    # Writes (through to the DB)
+    # -------------------------
+    def insert(self, data):
+        """Insert a product dict; returns the new id. sqlite3.IntegrityError on a duplicate code."""
+        product_id = self.repo.insert(data)
+        self.refresh([product_id])
+        return product_id
+
+    def update(self, data):
+        """Overwrite every field of data["id"]; returns True if the row exists."""
+        ok = self.repo.update(data)
+        self.refresh([data["id"]])
+        return ok
+
+    def update_fields(self, product_id, changes):
+        ok = self.repo.update_fields(product_id, changes)
+        self.refresh([product_id])
+        return ok
+
+    def increment_batch(self, items, by="code"):
+        rows = self.repo.increment_batch(items, by=by)
+        self.refresh([r["id"] for r in rows if r is not None])
+        return rows
+
+    def increment_or_insert(self, code, deltas, data):
+        """
+        Add deltas to product `code`, or insert `data` when the code doesn't exist (one transaction).
+        Returns True when an existing product was updated, False when inserted.
+        """
+        with self.repo.db.transaction():
+            row = self.repo.increment(code, deltas, by="code")
+            product_id = row["id"] if row else self.repo.insert(data)
+        self.refresh([product_id])
+        return row is not None
+
+    def delete(self, product_id):
+        ok = self.repo.delete(product_id)
+        self.refresh([product_id])
+        return ok
+
+    # -------------------------
+    # Sync with writes made elsewhere
+    # -------------------------
+    def refresh(self, product_ids):
+        """
+        Re-read product_ids from the DB (after they were written, here or by e.g. the
+        write-behind queue) and publish one event per row plus one summary event.
+        """
+        product_ids = {int(pid) for pid in product_ids}
+        if not product_ids:
+            return
+        fresh = {r["id"]: r for r in self.repo.fetch_by_ids(product_ids)}
+        for pid in sorted(product_ids):
+            row = fresh.get(pid)
+            if self._records is None:
+                # catalogue not loaded yet: nothing to patch, views still need to know
+                self._publish(UPDATED if row else DELETED, pid)
+            elif row is None:
+                if self._records.pop(pid, None) is not None:
+                    self._publish(DELETED, pid)
+            else:
+                kind = UPDATED if pid in self._records else INSERTED
+                self._records[pid] = _record(row)
+                self._publish(kind, pid)
+        if self._columns is not None:
+            self._columns.patch(self.repo.numeric_rows(product_ids), product_ids)
+        elif self._columns_pending is not None:
+            self._columns_pending.update(product_ids)
+        self._summary = self.repo.summary()
+        self._publish(SUMMARY)
+
+    def reload(self):
+        """Forget everything (e.g. after a CSV sync) and tell views to reload."""
+        self._records = None
+        self._summary = None
+        if self._columns is not None or self._columns_pending is not None:
+            self._columns = self._columns_pending = None
+            self.warm_columns(self._executor)
+        self._publish(RELOADED)
+
+
+def _record(row):
+    return tuple(row[col] for col in COLUMNS)
+
+
+# -------------------------
+# Shared instance
+# -------------------------
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide ProductStore."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ProductStore()
+    return _store
@@ -0,0 +1,127 @@
+# search_index.py
+import bisect
+import re
+
+from app.utils.product_store import FIELD_INDEX, INSERTED, UPDATED, DELETED, RELOADED
+
+_TOKEN_RE = re.compile(r"\w+")
+TOKEN_FIELDS = ("description", "name")
+
+
+def _tokens(rec):
+    text = " ".join(str(rec[FIELD_INDEX[f]] or "") for f in TOKEN_FIELDS)
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+class ProductSearchIndex:
+    """
+    In-memory prefix index over the ProductStore for as-you-type filtering:
+    - a sorted array of (code, id) → code prefixes by bisection
+    - a token → ids map (description, name) plus a sorted token array → token prefixes by bisection
+
+    search("sam 12") returns the ids where every term prefixes the code or a token.
+    Built once from the store; apply(kind, product_id) keeps it current from store events.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.build()
+
+    def build(self):
+        self._codes = []        # sorted [(code, id)]
+        self._postings = {}     # token → set of ids
+        self._tokens = []       # sorted distinct tokens
+        self._entries = {}      # id → (code, tokens) as indexed, needed to un-index
+        for pid, rec in self.store.records.items():
+            self._entries[pid] = self._key(rec)
+        self._codes = sorted((code, pid) for pid, (code, _) in self._entries.items())
+        for pid, (_, tokens) in self._entries.items():
+            for tok in tokens:
+                self._postings.setdefault(tok, set()).add(pid)
+        self._tokens = sorted(self._postings)
+
+    @staticmethod
+    def _key(rec):
+        return str(rec[FIELD_INDEX["code"]] or "").lower(), _tokens(rec)
+
+    # -------------------------
+    # Maintenance
+    # -------------------------
+    def apply(self, kind, product_id):
+        """Update the index from a ProductStore change event."""
+        if kind == RELOADED:
+            self.build()
+        elif kind in (INSERTED, UPDATED, DELETED):
+            self._remove(product_id)
+            rec = self.store.records.get(product_id)
+            if rec is not None:
+                self._add(product_id, rec)
+
+    def _add(self, pid, rec):
+        code, tokens = self._entries[pid] = self._key(rec)
+        bisect.insort(self._codes, (code, pid))
+        for tok in tokens:
+            ids = self._postings.get(tok)
+            if ids is None:
+                ids = self._postings[tok] = set()
+                bisect.insort(self._tokens, tok)
+            ids.add(pid)
+
+    def _remove(self, pid):
+        entry = self._entries.pop(pid, None)
+        if entry is None:
+            return
+        code, tokens = entry
+        i = bisect.bisect_left(self._codes, (code, pid))
+        if i < len(self._codes) and self._codes[i] == (code, pid):
+            del self._codes[i]
+        for tok in tokens:
+            ids = self._postings.get(tok)
+            if ids is None:
+                continue
+            ids.discard(pid)
+            if not ids:
+                del self._postings[tok]
+                del self._tokens[bisect.bisect_left(self._tokens, tok)]
+
+    # -------------------------
+    # Queries
+    # -------------------------
+    def _code_prefix(self, term):
+        i = bisect.bisect_left(self._codes, (term,))
+        found = set()
+        while i < len(self._codes) and self._codes[i][0].startswith(term):
+            found.add(self._codes[i][1])
+            i += 1
+        return found
+
+    def _token_prefix(self, term):
+        i = bisect.bisect_left(self._tokens, term)
+        found = set()
+        while i < len(self._tokens) and self._tokens[i].startswith(term):
+            found |= self._postings[self._tokens[i]]
+            i += 1
+        return found
+
+    def matches(self, product_id, text=""):
+        """Whether product_id is in search(text), checked on its own entry (no search run)."""
+        entry = self._entries.get(product_id)
+        if entry is None:
+            return False
+        code, tokens = entry
+        return all(code.startswith(term) or any(tok.startswith(term) for tok in tokens)
+                   for term in (text or "").lower().split())
+
+    def search(self, text=""):
+        """Ids matching every term of text (prefix of the code or of a word), in id order."""
+        terms = (text or "").lower().split()
+        if not terms:
+            return sorted(self._entries)
+        result = None
+        # most selective first: a long code prefix usually narrows to a handful of ids
+        for term in sorted(terms, key=len, reverse=True):
+            ids = self._code_prefix(term) | self._token_prefix(term)
+            result = ids if result is None else result & ids
+            if not result:
+                return []
+        return sorted(result)
@@ -0,0 +1,108 @@
+# search_pipeline.py
+import sqlite3
+
+from app.utils.data_handlers import load_data, update_stats, _sync_tree_rows
+from app.utils.dp_utils import fetch_totals
+from app.utils.product_repository import get_repository
+from app.utils.product_store import get_store
+from app.utils.task_executor import get_executor
+from app.utils.write_queue import flush_all
+
+
+class SearchPipeline:
+    """
+    Search-as-you-type for the main tree, off the Tk thread.
+
+    schedule(text) on every keystroke restarts a debounce timer; when it fires the
+    query runs as a TaskExecutor task. A newer search supersedes the older one: its
+    running SQL statement is interrupted (db.cancel_scope on the task's cancel event)
+    and its result is dropped, so only the latest result reaches the tree.
+    """
+
+    def __init__(self, root, tree, stat_vars=None, COLUMNS=None, delay_ms=200):
+        self.root = root
+        self.tree = tree
+        self.stat_vars = stat_vars
+        self.COLUMNS = COLUMNS
+        self.delay_ms = delay_ms
+        self.repo = get_repository()
+        self.executor = get_executor(root)
+
+        self._after_id = None
+        self._task = None   # latest search task
+
+    # -------------------------
+    # Tk thread
+    # -------------------------
+    def schedule(self, text):
+        """Debounce: (re)start the timer; the search runs delay_ms after the last keystroke."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self.root.after(self.delay_ms, lambda: self.start(text))
+
+    def start(self, text, on_applied=None):
+        """
+        Run a search now in the background, superseding any search in flight.
+        on_applied() is called once its result is on screen (e.g. the initial load at startup).
+        """
+        self._after_id = None
+        flush_all()  # the query must see inline edits that are still queued
+        self._cancel_running()
+        virtual = getattr(self.tree, "virtual_grid", None) is not None
+        # totals of a search come from the NumPy cache on this thread when it's built (no second query)
+        sql_totals = not text.strip() or get_store().columns is None
+        task = self.executor.submit(
+            self._query, text, virtual, sql_totals,
+            on_done=lambda result: self._apply(task, text, result, on_applied),
+            on_error=lambda e: print(f"⚠️ Search failed: {e}"),
+            name="search",
+        )
+        self._task = task
+
+    def flush(self, text):
+        """Drop pending/in-flight searches and load `text` synchronously (e.g. on Return)."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._cancel_running()
+        self._task = None
+        load_data(self.tree, text, self.stat_vars, self.COLUMNS)
+
+    def _cancel_running(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def _apply(self, task, text, result, on_applied=None):
+        if task is not self._task:
+            return  # superseded while its result was on the way
+        grid = getattr(self.tree, "virtual_grid", None)
+        if grid is not None:
+            grid.show_ids(text, result["ids"])
+        else:
+            rows = result["rows"]
+            _sync_tree_rows(self.tree, rows, self.COLUMNS or (rows[0].keys() if rows else []))
+        if self.stat_vars:
+            t = result.get("totals")
+            if t is None:
+                ids = result["ids"] if grid is not None else [r["id"] for r in result["rows"]]
+                t = get_store().totals(ids) or fetch_totals(text)
+            update_stats(self.stat_vars, t["total_required"], t["total_good"], t["total_damaged"], t["total_gift"], t["total_stock"])
+        if on_applied:
+            on_applied()
+
+    # -------------------------
+    # Worker thread
+    # -------------------------
+    def _query(self, task, text, virtual, sql_totals=True):
+        try:
+            with self.repo.db.cancel_scope(task.cancel_event):
+                result = {"totals": self.repo.totals(text)} if sql_totals else {}
+                if virtual:
+                    result["ids"] = self.repo.ids(text)
+                else:
+                    result["rows"] = self.repo.fetch(text)
+        except sqlite3.OperationalError:
+            task.check_cancelled()  # interrupted by a newer search → reported as cancelled
+            raise
+        task.check_cancelled()
+        return result
@@ -0,0 +1,143 @@
+# snapshot.py
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+from app.utils.db_manager import get_db
+from app.utils.product_repository import ProductRepository
+
+BACKUP_PAGES_PER_STEP = 1024                  # pages copied per backup step
+MEMORY_SNAPSHOT_MAX_BYTES = 256 * 1024 * 1024  # bigger databases are copied to a temp file
+
+
+class SnapshotDB:
+    """
+    Minimal stand-in for ConnectionManager over one read-only snapshot connection,
+    so a ProductRepository can query the snapshot with the same methods as the live DB.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @contextmanager
+    def reader(self):
+        yield self.conn
+
+    @contextmanager
+    def transaction(self):
+        raise sqlite3.OperationalError("snapshot is read-only")
+        yield  # unreachable, keeps this a generator for @contextmanager
+
+
+class PlanDB:
+    """
+    Stand-in for ConnectionManager over one pooled reader connection held in a read transaction
+    (see open_plan): every read sees the same snapshot, and transaction() is a savepoint that
+    only ever writes TEMP tables, so a dry run never takes the writer lock.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._savepoint_depth = 0
+
+    @contextmanager
+    def reader(self):
+        yield self.conn
+
+    @contextmanager
+    def transaction(self):
+        self._savepoint_depth += 1
+        name = f"plan_{self._savepoint_depth}"
+        self.conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute(f"ROLLBACK TO {name}")
+            self.conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            self.conn.execute(f"RELEASE {name}")
+        finally:
+            self._savepoint_depth -= 1
+
+
+def _db_size(db):
+    size = 0
+    for suffix in ("", "-wal"):
+        try:
+            size += os.path.getsize(db.db_file + suffix)
+        except OSError:
+            pass
+    return size
+
+
+@contextmanager
+def open_snapshot(target="auto", pages=BACKUP_PAGES_PER_STEP, progress=None, db=None):
+    """
+    Copy the live database with the sqlite3 backup API, a few pages at a time, and
+    yield a ProductRepository over that point-in-time copy.
+
+    target: "memory", "file" (temp file, removed afterwards) or "auto" (memory unless the DB is large).
+    progress: optional callback(remaining_pages, total_pages) per backup step.
+
+    The source is read through a pooled reader; in WAL mode that never blocks writers,
+    and a long export then reads only the copy, so it holds a read transaction on
+    inventory.db only for the (short) copy, not for the whole export.
+    """
+    db = db or get_db()
+    if target == "auto":
+        target = "memory" if _db_size(db) <= MEMORY_SNAPSHOT_MAX_BYTES else "file"
+
+    tmp_path = None
+    if target == "memory":
+        dest = sqlite3.connect(":memory:", check_same_thread=False)
+    else:
+        fd, tmp_path = tempfile.mkstemp(prefix="inventory-snapshot-", suffix=".db")
+        os.close(fd)
+        dest = sqlite3.connect(tmp_path, check_same_thread=False)
+        dest.execute("PRAGMA journal_mode = OFF")
+        dest.execute("PRAGMA synchronous = OFF")
+
+    try:
+        with db.reader() as src:
+            # Hold one read transaction for the whole copy: every step then reads the same
+            # WAL snapshot, so commits made meanwhile don't force the backup to restart.
+            src.execute("BEGIN")
+            try:
+                src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+                src.backup(
+                    dest,
+                    pages=pages,
+                    progress=(lambda status, remaining, total: progress(remaining, total)) if progress else None,
+                )
+            finally:
+                src.execute("COMMIT")
+        dest.row_factory = sqlite3.Row
+        dest.execute("PRAGMA query_only = ON")
+        yield ProductRepository(db=SnapshotDB(dest))
+    finally:
+        dest.close()
+        if tmp_path:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+@contextmanager
+def open_plan(db=None):
+    """
+    Yield a ProductRepository for a dry run (apply=False calls only) over one pooled reader
+    connection, in one read transaction: the plan works from a single snapshot of the DB while
+    edits, Add Stock, deletes and write-queue flushes go on. Its staging and tracking tables are
+    TEMP tables of that connection, dropped by the final rollback.
+    """
+    db = db or get_db()
+    with db.reader() as conn:
+        conn.execute("BEGIN")
+        try:
+            conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()  # the snapshot starts here
+            yield ProductRepository(db=PlanDB(conn))
+        finally:
+            conn.execute("ROLLBACK")
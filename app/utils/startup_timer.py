@@ -0,0 +1,61 @@
+# startup_timer.py
+import os
+import sys
+import time
+
+# imported first thing in main.py → t0 is "main.py started"
+_T0 = time.perf_counter()
+_CPU_BEFORE_MAIN = time.process_time()  # interpreter / PyInstaller bootstrap work before main.py
+
+REPORT_FLAG = "--startup-report"          # --startup-report[=file]: measure, report, quit (headless runs)
+REPORT_ENV = "INVENTORY_STARTUP_REPORT"   # =1 or =file: measure and report, keep running
+
+
+class StartupTimer:
+    """
+    Cold-start timing: mark(label) at each startup milestone, report() when the
+    window became usable. Disabled timers cost one list append per mark.
+    """
+
+    def __init__(self, argv=None, environ=None):
+        argv = sys.argv if argv is None else argv
+        environ = os.environ if environ is None else environ
+        self.marks = []
+        self.quit_after_report = False
+        self.path = None
+
+        flag = next((a for a in argv if a == REPORT_FLAG or a.startswith(REPORT_FLAG + "=")), None)
+        env = environ.get(REPORT_ENV)
+        self.enabled = bool(flag or env)
+        if flag:
+            self.quit_after_report = True
+            self.path = flag.partition("=")[2] or None
+        elif env and env != "1":
+            self.path = env
+
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter()))
+
+    def lines(self):
+        frozen = "PyInstaller" if getattr(sys, "frozen", False) else "source"
+        out = [f"⏱️ Startup ({frozen}, Python {sys.version.split()[0]}, "
+               f"{_CPU_BEFORE_MAIN * 1000:.0f} ms CPU before main.py)"]
+        prev = _T0
+        for label, t in self.marks:
+            out.append(f"  {(t - _T0) * 1000:8.1f} ms  (+{(t - prev) * 1000:7.1f})  {label}")
+            prev = t
+        return out
+
+    def report(self):
+        """Write the report to the file given, else stderr (falls back to a file in windowed builds)."""
+        if not self.enabled:
+            return
+        text = "\n".join(self.lines()) + "\n"
+        path = self.path
+        if path is None and sys.stderr is None:
+            path = "startup_report.log"  # PyInstaller --windowed: no console to print to
+        if path:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(time.strftime("%Y-%m-%d %H:%M:%S ") + text)
+        else:
+            sys.stderr.write(text)
@@ -0,0 +1,169 @@
+# task_executor.py
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+READ_WORKERS = 3  # parallel read/file tasks (the DB reader pool has 4 connections)
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task by Task.check_cancelled() once cancel() was requested."""
+
+
+class Task:
+    """
+    Handle for a submitted task. The task function gets it as its first argument:
+    task.report(done, total, message) to publish progress, task.check_cancelled() to stop.
+    From the Tk side: task.cancel(), task.future (a concurrent.futures.Future).
+    """
+
+    def __init__(self, executor, name, on_done, on_error, on_progress, on_cancelled):
+        self.executor = executor
+        self.name = name
+        self.future = None
+        self.cancel_event = threading.Event()
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancelled = on_cancelled
+
+    # worker side
+    def report(self, done, total=None, message=None):
+        if self.on_progress:
+            self.executor._post(self, "progress", (done, total, message))
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise TaskCancelled(self.name)
+
+    # Tk side
+    def cancel(self):
+        """Ask the task to stop (it stops at its next check); a task still queued never starts."""
+        self.cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            self.executor._post(self, "cancelled", None)  # never started → run() won't post
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class TaskExecutor:
+    """
+    Runs DB/file work off the Tk thread.
+
+    - submit(fn, ...)               → thread pool (reads, exports, searches run in parallel)
+    - submit(fn, ..., writer=True)  → the single writer thread (DB writes never wait on each other)
+
+    fn(task, *args, **kwargs) runs in the background; on_done(result), on_error(exc),
+    on_progress(done, total, message) and on_cancelled() are called on the Tk thread:
+    workers post to a queue that the Tk loop drains with root.after while tasks are running.
+    """
+
+    def __init__(self, root, read_workers=READ_WORKERS, poll_ms=50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        self._events = queue.Queue()   # worker → Tk thread
+        self._running = 0              # tasks whose final event wasn't dispatched yet (Tk thread only)
+        self._poll_id = None
+
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None, on_cancelled=None,
+               writer=False, name=None, **kwargs):
+        """Queue fn(task, *args, **kwargs); returns the Task (its .future is the Future)."""
+        task = Task(self, name or getattr(fn, "__name__", "task"), on_done, on_error, on_progress, on_cancelled)
+
+        def run():
+            if task.cancelled:
+                self._post(task, "cancelled", None)
+                return None
+            try:
+                result = fn(task, *args, **kwargs)
+            except TaskCancelled:
+                self._post(task, "cancelled", None)
+                raise
+            except BaseException as e:
+                self._post(task, "error", e)
+                raise
+            self._post(task, "done", result)
+            return result
+
+        task.future = (self._writer if writer else self._pool).submit(run)
+        self._running += 1
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+        return task
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        self._writer.shutdown(wait=wait)
+
+    # -------------------------
+    # Tk thread dispatch
+    # -------------------------
+    def _post(self, task, kind, payload):
+        self._events.put((task, kind, payload))
+
+    def _poll(self):
+        self._poll_id = None
+        progress = {}  # only the latest progress per task is worth drawing
+        finished = []
+        while True:
+            try:
+                task, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                progress[task] = payload
+            else:
+                progress.pop(task, None)
+                finished.append((task, kind, payload))
+
+        for task, payload in progress.items():
+            self._call(task.on_progress, *payload)
+        for task, kind, payload in finished:
+            self._running -= 1
+            if kind == "done":
+                self._call(task.on_done, payload)
+            elif kind == "error":
+                if task.on_error:
+                    self._call(task.on_error, payload)
+                else:
+                    print(f"⚠️ Task {task.name} failed: {payload}")
+            elif kind == "cancelled":
+                self._call(task.on_cancelled)
+
+        if self._running > 0:
+            try:
+                self._poll_id = self.root.after(self.poll_ms, self._poll)
+            except Exception:
+                self._poll_id = None  # root already destroyed
+
+    @staticmethod
+    def _call(callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"⚠️ Task callback error: {e}")
+
+
+# -------------------------
+# Shared instance
+# -------------------------
+_executor = None
+
+
+def get_executor(root=None):
+    """Return the process-wide TaskExecutor; the first call must pass the Tk root."""
+    global _executor
+    if _executor is None:
+        if root is None:
+            raise RuntimeError("get_executor() needs the Tk root on first use")
+        _executor = TaskExecutor(root)
+    return _executor
@@ -0,0 +1,213 @@
+# write_queue.py
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+
+from app.utils.product_repository import get_repository, PRODUCT_FIELDS
+
+WRITABLE_FIELDS = set(PRODUCT_FIELDS) - {"total_qty"}
+
+_queues = weakref.WeakSet()
+
+
+def flush_all():
+    """Commit pending edits of every live queue (call before a full reload so it reads its own writes)."""
+    for q in list(_queues):
+        q.flush()
+
+
+def uncommitted_ids():
+    """Product ids with edits some live queue hasn't committed yet (queued or being written)."""
+    ids = set()
+    for q in list(_queues):
+        ids |= q.uncommitted_ids()
+    return ids
+
+
+def any_pending():
+    """True while some live queue still holds edits that aren't committed yet."""
+    return bool(uncommitted_ids())
+
+
+class WriteBehindQueue:
+    """
+    Background group-commit queue for inline cell edits.
+
+    submit() only records the change in memory (edits to the same product id are merged,
+    last value wins). A worker thread writes everything pending in ONE transaction when
+    - flush_interval_ms passed since the first pending edit, or
+    - max_pending products are waiting, or
+    - flush() / close() is called.
+
+    Results come back on the Tk thread (polled with root.after):
+    on_flushed(product_ids) after each successful commit, on_error(product_id, changes, exc) per failed row.
+    """
+
+    def __init__(self, root, flush_interval_ms=300, max_pending=100, on_flushed=None, on_error=None, poll_ms=50):
+        self.root = root
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.on_flushed = on_flushed
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+
+        self._cond = threading.Condition()
+        self._pending = {}               # product_id → {field: value}
+        self._first_pending_at = None
+        self._flush_requested = False
+        self._request_seq = 0
+        self._done_seq = 0
+        self._stop = False
+        self._in_flight = set()          # ids of the batch being written
+        self._events = queue.Queue()     # worker → Tk thread
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        self._poll_id = root.after(self.poll_ms, self._poll)
+        _queues.add(self)
+
+    # -------------------------
+    # Public API (Tk thread)
+    # -------------------------
+    def submit(self, product_id, changes):
+        """
+        Queue {field: value} changes for product_id; returns immediately.
+        After close() the worker is gone, so the change is written here and now instead
+        (a FocusOut save fired while the window is torn down must not be lost).
+        """
+        unknown = set(changes) - WRITABLE_FIELDS
+        if unknown:
+            raise ValueError(f"Not writable: {', '.join(sorted(unknown))}")
+        with self._cond:
+            closed = self._stop
+            if not closed:
+                if not self._pending:
+                    self._first_pending_at = time.monotonic()
+                self._pending.setdefault(int(product_id), {}).update(changes)
+                self._cond.notify()
+        if closed:
+            flushed = self._write({int(product_id): dict(changes)})
+            if flushed:
+                self._events.put(("flushed", flushed, None, None))
+            self._poll(reschedule=False)
+
+    def pending(self):
+        """Snapshot of edits not yet committed: {product_id: {field: value}}."""
+        with self._cond:
+            return {pid: dict(ch) for pid, ch in self._pending.items()}
+
+    def uncommitted_ids(self):
+        """Ids whose edits aren't committed yet: pending, or in the batch being written."""
+        with self._cond:
+            return set(self._pending) | self._in_flight
+
+    def flush(self, wait=True):
+        """Write everything pending now; with wait=True block until it is committed."""
+        with self._cond:
+            if not self._pending and not self._in_flight:
+                return
+            self._request_seq += 1
+            seq = self._request_seq
+            self._flush_requested = True
+            self._cond.notify()
+            if wait:
+                while self._done_seq < seq and self._thread.is_alive():
+                    self._cond.wait()
+        if wait:
+            self._poll(reschedule=False)
+
+    def close(self):
+        """Flush remaining edits and stop the worker (call before the window is destroyed)."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        self._thread.join()
+        _queues.discard(self)
+        if self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        self._poll(reschedule=False)
+
+    # -------------------------
+    # Worker thread
+    # -------------------------
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop and not self._flush_requested:
+                    self._cond.wait()
+                if self._pending:
+                    deadline = self._first_pending_at + self.flush_interval
+                    while (not self._stop and not self._flush_requested
+                           and len(self._pending) < self.max_pending):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                batch, self._pending = self._pending, {}
+                self._in_flight = set(batch)
+                self._flush_requested = False
+                seq = self._request_seq
+                stop = self._stop
+
+            flushed = self._write(batch) if batch else None
+
+            with self._cond:
+                self._in_flight = set()
+                self._done_seq = max(self._done_seq, seq)
+                self._cond.notify_all()
+                done = stop and not self._pending
+            if flushed:
+                # only now: a view refreshing on it must not see these ids as still in flight
+                self._events.put(("flushed", flushed, None, None))
+            if done:
+                return
+
+    def _write(self, batch):
+        """Commit batch; returns the ids written (errors are queued as events), None if nothing was."""
+        failed = set()
+        repo = get_repository()
+        try:
+            with repo.db.transaction():
+                for pid, changes in batch.items():
+                    try:
+                        repo.update_fields(pid, changes)  # nested → one SAVEPOINT per product
+                    except sqlite3.Error as e:
+                        failed.add(pid)
+                        self._events.put(("error", pid, changes, e))
+        except sqlite3.Error as e:
+            # commit itself failed → nothing from this batch was written
+            for pid, changes in batch.items():
+                if pid not in failed:
+                    self._events.put(("error", pid, changes, e))
+            return None
+        return [pid for pid in batch if pid not in failed]
+
+    # -------------------------
+    # Tk thread dispatch
+    # -------------------------
+    def _poll(self, reschedule=True):
+        while True:
+            try:
+                kind, pid, changes, exc = self._events.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if kind == "flushed" and self.on_flushed and pid:
+                    self.on_flushed(pid)
+                elif kind == "error" and self.on_error:
+                    self.on_error(pid, changes, exc)
+                elif kind == "error":
+                    print(f"⚠️ Write failed for product {pid}: {exc}")
+            except Exception as e:
+                print(f"⚠️ Write queue callback error: {e}")
+        if reschedule and not self._stop:
+            try:
+                self._poll_id = self.root.after(self.poll_ms, self._poll)
+            except Exception:
+                self._poll_id = None  # root already destroyed
@@ -1,6 +1,11 @@
 # main_app.py
 
+from app.utils.startup_timer import StartupTimer
+timer = StartupTimer()  # --startup-report / INVENTORY_STARTUP_REPORT → time-to-first-interaction report
+
+import multiprocessing
 import tkinter as tk
+from tkinter import messagebox
 from datetime import datetime
 import ttkbootstrap as tb
 from ttkbootstrap.constants import *
@@ -10,17 +15,20 @@ from app.constants.index import COLUMNS, EDITABLE_FIELDS, FONT
 
 # Data Management Utils
 from app.utils.dp_utils import init_db 
-from app.utils.export_to_csv import export_all_to_csv, export_mismatch_to_csv
-from app.utils.export_to_pdf import export_all_to_pdf, export_mismatch_to_pdf
+# exports (reportlab) and the CSV manager are imported on first use, see "Lazy commands" below
 
 # UI Components
 from app.ui.ui_components import setup_main_window, setup_header, setup_top_controls, setup_stats_frame, setup_treeview
-from app.utils.data_handlers import load_data, search_products
+from app.utils.data_handlers import load_data, search_products, follow_store
 from app.utils.cell_editor import setup_tree_bindings
+from app.utils.search_pipeline import SearchPipeline
+from app.utils.task_executor import get_executor
+from app.utils.product_store import get_store
 from app.ui.delete_selected import delete_selected
 from app.ui.open_add_window import open_add_window
 from app.ui.open_csv_manager import open_csv_manager
 from app.ui.open_product_manager_window import open_product_manager_window
+timer.mark("imports")
 
 # Global Constants for Editable Fields
 EDITABLE_INDEXES = [COLUMNS.index(f) for f in COLUMNS if f in EDITABLE_FIELDS]
@@ -28,59 +36,114 @@ FIRST_EDITABLE_INDEX = EDITABLE_INDEXES[0] if EDITABLE_INDEXES else 1
 
 
 # -------------------------
-# UI Setup
-# -------------------------
-app, root = setup_main_window()
-search_var = tk.StringVar() 
-
-# 1. Header
-setup_header(root)
-
-# 2. Top Controls (Search & Buttons)
-top_frame, search_entry, btn_frame = setup_top_controls(root, search_var)
-
-# 3. Table & Stats container
-container = tb.Frame(root)
-container.pack(fill="both", expand=True, padx=15, pady=(0, 15))
-
-# 4. Stats Frame
-stats_frame, stat_vars = setup_stats_frame(container)
-# stat_vars = (stat_req_val, stat_good_val, stat_dam_val, stat_gift_val, stat_tot_val)
-
-# 5. Treeview
-tree, style = setup_treeview(container)
-
-
-# -------------------------
-# Bindings & Commands
-# -------------------------
-
-# Search Binding
-search_entry.bind("<KeyRelease>", lambda e: load_data(tree, search_var.get(), stat_vars))
-search_entry.bind("<Return>", lambda e: search_products(tree, search_var, FIRST_EDITABLE_INDEX))
-search_entry.bind("<Tab>", lambda e: search_products(tree, search_var, FIRST_EDITABLE_INDEX))
-
-# Buttons Commandsroot, load_data_func, tree, search_term, stat_vars
-tb.Button(btn_frame, text="➕ Add CSV ", bootstyle="success", command=lambda: open_csv_manager(root, load_data, tree, search_var.get(), stat_vars)).pack(side=LEFT, padx=4) 
-tb.Button(btn_frame, text="➕ Add Product", bootstyle="success", command=lambda: open_add_window(root, load_data, tree, search_var.get(), stat_vars)).pack(side=LEFT, padx=4)
-tb.Button(btn_frame, text="📦 Add Stock", bootstyle="info", command=lambda:open_product_manager_window(root, load_data, tree, search_var, stat_vars)).pack(side=LEFT, padx=4)
-tb.Button(btn_frame, text="📥 Export CSV", bootstyle="primary", command=lambda: export_all_to_csv()).pack(side=LEFT, padx=4)
-tb.Button(btn_frame, text="📄 Export PDF", bootstyle="primary", command=lambda: export_all_to_pdf()).pack(side=LEFT, padx=4)
-tb.Button(btn_frame, text="⚠️ Mismatch CSV", bootstyle="warning", command=lambda: export_mismatch_to_csv()).pack(side=LEFT, padx=4)
-tb.Button(btn_frame, text="⚠️ Mismatch PDF", bootstyle="warning", command=lambda: export_mismatch_to_pdf()).pack(side=LEFT, padx=4)
-tb.Button(btn_frame, text="🗑️ Delete", bootstyle="danger", command=lambda: delete_selected(tree, load_data, search_var.get(), stat_vars)).pack(side=LEFT, padx=4)
-
-
-# Treeview Cell Editing & Navigation
-setup_tree_bindings(
-    tree, root, EDITABLE_FIELDS,
-    FIRST_EDITABLE_INDEX, EDITABLE_INDEXES, load_data, search_var, stat_vars
-)
-
-
-# -------------------------
-# Init DB & Run
+# Lazy commands (heavy modules load when first clicked)
 # -------------------------
-init_db()
-load_data(tree, search_var.get(), stat_vars) # Initial load
-root.mainloop()
\ No newline at end of file
+def export_csv(mismatch=False):
+    from app.utils import export_to_csv
+    (export_to_csv.export_mismatch_to_csv if mismatch else export_to_csv.export_all_to_csv)()
+
+def export_pdf(mismatch=False):
+    from app.utils import export_to_pdf  # imports reportlab
+    (export_to_pdf.export_mismatch_to_pdf if mismatch else export_to_pdf.export_all_to_pdf)()
+
+
+def main():
+    # -------------------------
+    # UI Setup
+    # -------------------------
+    app, root = setup_main_window()
+    timer.mark("main window")
+    search_var = tk.StringVar() 
+    executor = get_executor(root)  # background DB/file work (CSV sync, exports, search)
+
+    # 1. Header
+    setup_header(root)
+
+    # 2. Top Controls (Search & Buttons)
+    top_frame, search_entry, btn_frame = setup_top_controls(root, search_var)
+
+    # 3. Table & Stats container
+    container = tb.Frame(root)
+    container.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+
+    # 4. Stats Frame
+    stats_frame, stat_vars = setup_stats_frame(container)
+    # stat_vars = (stat_req_val, stat_good_val, stat_dam_val, stat_gift_val, stat_tot_val)
+
+    # 5. Treeview
+    tree, style = setup_treeview(container, virtual=True)
+
+
+    # -------------------------
+    # Bindings & Commands
+    # -------------------------
+
+    # Search Binding (debounced, runs off the Tk thread; Return/Tab load the final text right away)
+    search = SearchPipeline(root, tree, stat_vars)
+    search_entry.bind("<KeyRelease>", lambda e: search.schedule(search_var.get()))
+    search_entry.bind("<Return>", lambda e: search.flush(search_var.get()) or search_products(tree, search_var, FIRST_EDITABLE_INDEX))
+    search_entry.bind("<Tab>", lambda e: search.flush(search_var.get()) or search_products(tree, search_var, FIRST_EDITABLE_INDEX))
+
+    # Buttons Commandsroot, load_data_func, tree, search_term, stat_vars
+    tb.Button(btn_frame, text="➕ Add CSV ", bootstyle="success", command=lambda: open_csv_manager(root, load_data, tree, search_var.get(), stat_vars)).pack(side=LEFT, padx=4) 
+    tb.Button(btn_frame, text="➕ Add Product", bootstyle="success", command=lambda: open_add_window(root, load_data, tree, search_var.get(), stat_vars)).pack(side=LEFT, padx=4)
+    tb.Button(btn_frame, text="📦 Add Stock", bootstyle="info", command=lambda:open_product_manager_window(root, load_data, tree, search_var, stat_vars)).pack(side=LEFT, padx=4)
+    tb.Button(btn_frame, text="📥 Export CSV", bootstyle="primary", command=lambda: export_csv()).pack(side=LEFT, padx=4)
+    tb.Button(btn_frame, text="📄 Export PDF", bootstyle="primary", command=lambda: export_pdf()).pack(side=LEFT, padx=4)
+    tb.Button(btn_frame, text="⚠️ Mismatch CSV", bootstyle="warning", command=lambda: export_csv(mismatch=True)).pack(side=LEFT, padx=4)
+    tb.Button(btn_frame, text="⚠️ Mismatch PDF", bootstyle="warning", command=lambda: export_pdf(mismatch=True)).pack(side=LEFT, padx=4)
+    tb.Button(btn_frame, text="🗑️ Delete", bootstyle="danger", command=lambda: delete_selected(tree, load_data, search_var.get(), stat_vars)).pack(side=LEFT, padx=4)
+
+
+    # Treeview Cell Editing & Navigation
+    write_queue = setup_tree_bindings(
+        tree, root, EDITABLE_FIELDS,
+        FIRST_EDITABLE_INDEX, EDITABLE_INDEXES, load_data, search_var, stat_vars
+    )
+
+    # Writes from any window reach the main grid as ProductStore change events
+    follow_store(tree, search_var, stat_vars)
+
+    def on_close():
+        # commit any inline edits still waiting in the write-behind queue
+        write_queue.close()
+        executor.shutdown(wait=False)  # queued tasks are dropped; a running one finishes in the background
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    timer.mark("widgets built")
+
+
+    # -------------------------
+    # Init DB & Run
+    # -------------------------
+    # The window paints first; the schema check/migration runs on the writer thread and the
+    # initial load then streams in like a search (ids + totals in the background, rows page by page).
+    def on_ready():
+        timer.mark("initial data on screen (interactive)")
+        get_store().warm_columns(executor)  # NumPy stats cache, built in the background (needs numpy)
+        timer.report()
+        if timer.quit_after_report:
+            on_close()
+
+    def on_db_ready(_version):
+        timer.mark("database ready")
+        search.start(search_var.get(), on_applied=on_ready)
+
+    def on_db_error(e):
+        messagebox.showerror("Database Error", f"❌ Could not open the database:\n{e}")
+        on_close()
+
+    def on_first_idle():
+        timer.mark("first paint")
+        executor.submit(lambda task: init_db(), writer=True, name="init_db", on_done=on_db_ready, on_error=on_db_error)
+
+    root.after_idle(on_first_idle)
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    # CSV parse workers are separate processes (see inventory_csv_manager.sync_csv_files_to_db):
+    # they import this module without running the app, and start here in PyInstaller builds
+    multiprocessing.freeze_support()
+    main()